@@ -3,45 +3,101 @@
 # - No prediction when hands are not present
 # - Clears sentence after CLEAR_IDLE_SECONDS of no-hands
 # - Shows a countdown hint while hands are down
-# - Uses majority vote + confidence thresholds + debounce
+# - Smooths class probabilities + confidence thresholds + debounce
 # - Assumes your model includes Normalization() inside
 # ============================================================
 
+import argparse
 import cv2
 import time
 import json
 import numpy as np
-from collections import Counter
 import mediapipe as mp
-import tensorflow as tf
 import pyvirtualcam
 import pyttsx3
-import threading
+import signal
+import sys
+from keypoints import KeypointWindow, PresenceHistory, extract_keypoints_into
+from sign_model import InferenceWorker, StrideController, load_classifier
+from perf import LatencyStats, StageTimes
+from recording import KeypointRecorder
+from captions import CaptionBar
+from speech_output import SpeechWorker
+from smoothing import PredictionSmoother
+from trackers import HOLISTIC, TRACKERS, HandGate, analysis_frame, create_tracker
 
 # --------------- CONFIG ---------------
 MODEL_PATH = "wlasl_demo.keras"     # or "wlasl_savedmodel" if you exported SavedModel folder
+TFLITE_MODEL_PATH = "wlasl_demo.tflite"  # used instead of MODEL_PATH when present (ml/export_tflite.py)
 ACTIONS_PATH = "actions.json"
 
 SEQUENCE_LENGTH = 30
 FEATURE_DIM = 258
 
 # Prediction gating / smoothing
-WINDOW = 10             # majority vote window over last WINDOW predictions
+SMOOTHING = "ema"       # "ema" / "mean" smooth the probabilities, "vote" = majority vote of labels
+WINDOW_SECONDS = 0.5    # EMA time constant, or the window for "mean" / "vote"
+MIN_VOTES = 3           # need at least this many predictions before committing
 IDLE_THRESH = 0.4      # if max prob < this => idle (no output)
 COMMIT_THRESH = 0.5    # need >= this to commit a word
 HOLD_TIME = 0.5         # seconds stable before committing
 HAND_RATIO_THRESH = 0.5 # require hands present in >=% of last 30 frames
 
+# Inference stride: classify every INFERENCE_STRIDE-th frame once the window is full
+INFERENCE_STRIDE = 1
+ADAPTIVE_STRIDE = True  # raise the stride when the CPU is saturated or the sign is stable, False = fixed stride
+MAX_INFERENCE_STRIDE = 5
+
 # Sentence reset if hands are down
 CLEAR_IDLE_SECONDS = 10.0
 
+# Detect landmarks on a copy downscaled to this width (0 = native resolution, e.g. 960 or 640),
+# the virtual camera output stays at full resolution. Check bench/bench_trackers.py --widths first.
+ANALYSIS_WIDTH = 0
+
+# Text-to-speech queue
+TTS_MAX_QUEUE = 5           # words waiting to be spoken, the oldest is dropped when full
+TTS_MERGE_SECONDS = 0.4     # words committed within this time are spoken together
+TTS_MAX_AGE_SECONDS = 3.0   # words waiting longer than this are not spoken anymore
+
+# Idle gate: while nobody is signing, only look for hands with a cheap detector
+IDLE_GATE = True
+IDLE_GATE_SECONDS = 3.0   # back to the cheap check after this long without hands
+IDLE_CHECK_EVERY = 3      # check every Nth frame while idle
+IDLE_CHECK_WIDTH = 320    # frame width used for the idle check
+
 # Allow word repeats after this duration (shorter than CLEAR_IDLE_SECONDS)
 REPEAT_DELAY_SECONDS = 5.0  # seconds before same word can be committed again
 
+# --------------- ARGUMENTS ---------------
+parser = argparse.ArgumentParser(description='Real-time ASL recognition to a virtual camera')
+parser.add_argument('--tracker', choices=TRACKERS, default=HOLISTIC,
+                    help='Landmark tracker: full Holistic, or hands-pose which skips the unused face mesh (default: holistic)')
+parser.add_argument('--model-complexity', type=int, choices=[0, 1, 2], default=None,
+                    help='MediaPipe model complexity (default: 1)')
+parser.add_argument('--analysis-width', type=int, default=ANALYSIS_WIDTH,
+                    help=f'Width of the frame used for landmark detection, 0 = native (default: {ANALYSIS_WIDTH})')
+parser.add_argument('--no-idle-gate', action='store_true',
+                    help='Run the full tracker on every frame, even while no hands are visible')
+parser.add_argument('--record', metavar='PATH',
+                    help='Save per-frame keypoints and timestamps to a .npz for ml/replay_eval.py')
+args = parser.parse_args()
+
 # --------------- LOAD MODEL + LABELS ---------------
 print("Loading model...")
-model = tf.keras.models.load_model(MODEL_PATH)
-print("Model loaded successfully!")
+model = load_classifier(MODEL_PATH, TFLITE_MODEL_PATH)  # warmed up here
+print(f"Model loaded successfully! (backend: {model.name})")
+
+# Classify on a separate thread so a slow predict never holds up the video
+inference = InferenceWorker(model, SEQUENCE_LENGTH, FEATURE_DIM)
+inference.start()
+stride = StrideController(
+    INFERENCE_STRIDE,
+    adaptive=ADAPTIVE_STRIDE,
+    min_stride=INFERENCE_STRIDE,
+    max_stride=MAX_INFERENCE_STRIDE,
+    stable_conf=COMMIT_THRESH
+)
 print("Loading actions...")
 with open(ACTIONS_PATH, "r") as f:
     actions = json.load(f)
@@ -73,44 +129,27 @@ tts_engine.setProperty('rate', 150)  # Speed of speech
 tts_engine.setProperty('volume', 1.0)  # Volume (0.0 to 1.0)
 print("Text-to-speech initialized!")
 
-# Lock to prevent concurrent TTS calls
-tts_lock = threading.Lock()
+# One persistent speech thread, words signed close together are spoken as one phrase
+speech = SpeechWorker(tts_engine, TTS_MAX_QUEUE, TTS_MERGE_SECONDS, TTS_MAX_AGE_SECONDS)
+speech.start()
 
 def speak_text(text):
-    """Speak text in a separate thread to avoid blocking video processing"""
-    def _speak():
-        try:
-            with tts_lock:  # Only one thread can use TTS at a time
-                tts_engine.say(text)
-                tts_engine.runAndWait()
-        except Exception as e:
-            print(f"TTS error: {e}")
-    
-    thread = threading.Thread(target=_speak, daemon=True)
-    thread.start()
+    """Queue text for the speech thread, never blocks video processing"""
+    speech.say(text)
 
 # --------------- MEDIAPIPE SETUP ---------------
 mp_holistic = mp.solutions.holistic
 mp_drawing = mp.solutions.drawing_utils
 
-def mediapipe_detection(frame_bgr, holistic):
+def mediapipe_detection(frame_bgr, tracker, analysis_width=0):
+    # The only color conversion per frame: the RGB image feeds MediaPipe and the
+    # virtual camera, and the overlay is drawn on it directly
     image = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-    image = np.ascontiguousarray(image)
     image.flags.writeable = False
-    results = holistic.process(image)
+    results = tracker.process(analysis_frame(image, analysis_width))
     image.flags.writeable = True
-    image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
     return image, results
 
-def extract_keypoints(results):
-    pose = np.array([[r.x, r.y, r.z, r.visibility]
-                     for r in results.pose_landmarks.landmark]).flatten() if results.pose_landmarks else np.zeros(33*4)
-    lh   = np.array([[r.x, r.y, r.z]
-                     for r in results.left_hand_landmarks.landmark]).flatten() if results.left_hand_landmarks else np.zeros(21*3)
-    rh   = np.array([[r.x, r.y, r.z]
-                     for r in results.right_hand_landmarks.landmark]).flatten() if results.right_hand_landmarks else np.zeros(21*3)
-    return np.concatenate([pose, lh, rh]).astype(np.float32)
-
 def draw_landmarks(image, results):
     if results.pose_landmarks:
         mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_holistic.POSE_CONNECTIONS)
@@ -123,61 +162,25 @@ def hands_present(results):
     return (results.left_hand_landmarks is not None) or (results.right_hand_landmarks is not None)
 
 # --------------- SMOOTHING STATE ---------------
-pred_hist = []
-last_commit = None
-last_commit_time = None  # Track when last commit happened
-hold_label = None
-hold_start = None
+smoother = PredictionSmoother(
+    actions,
+    mode=SMOOTHING,
+    window_seconds=WINDOW_SECONDS,
+    min_votes=MIN_VOTES,
+    idle_thresh=IDLE_THRESH,
+    commit_thresh=COMMIT_THRESH,
+    hold_time=HOLD_TIME,
+    repeat_delay=REPEAT_DELAY_SECONDS
+)
 
 def reset_prediction_state():
-    global pred_hist, hold_label, hold_start
-    pred_hist.clear()
-    hold_label = None
-    hold_start = None
+    smoother.reset()
 
-def update_prediction(probs):
+def update_prediction(probs, now=None):
     """
     Returns: (committed_word_or_empty_string, live_label, live_conf)
     """
-    global pred_hist, last_commit, last_commit_time, hold_label, hold_start
-
-    pred = int(np.argmax(probs))
-    conf = float(probs[pred])
-
-    # idle gate based on confidence
-    if conf < IDLE_THRESH:
-        reset_prediction_state()
-        return "", "Idle", conf
-
-    pred_hist.append(pred)
-    if len(pred_hist) > WINDOW:
-        pred_hist.pop(0)
-
-    if len(pred_hist) < WINDOW:
-        return "", actions[pred], conf
-
-    maj = Counter(pred_hist).most_common(1)[0][0]
-    now = time.time()
-
-    # require enough confidence to commit
-    if conf < COMMIT_THRESH:
-        return "", actions[maj], conf
-
-    # debounce: require stable label for HOLD_TIME seconds
-    if hold_label != maj:
-        hold_label = maj
-        hold_start = now
-        return "", actions[maj], conf
-
-    if (now - hold_start) >= HOLD_TIME:
-        word = actions[maj]
-        # Allow repeat if enough time has passed since last commit
-        if word != last_commit or (last_commit_time is not None and (now - last_commit_time) >= REPEAT_DELAY_SECONDS):
-            last_commit = word
-            last_commit_time = now
-            return word, actions[maj], conf
-
-    return "", actions[maj], conf
+    return smoother.update(probs, now)
 
 # --------------- WEBCAM LOOP ---------------
 cap = cv2.VideoCapture(0, cv2.CAP_AVFOUNDATION)
@@ -200,126 +203,166 @@ except Exception as e:
     print(f"Warning: Could not create virtual camera: {e}")
     print("Continuing without virtual camera output...")
 
-sequence = []
+# Preallocated keypoint window and hand-presence history, no per-frame allocation
+sequence = KeypointWindow(SEQUENCE_LENGTH, FEATURE_DIM)
 sentence = []
-hand_history = []
+hand_history = PresenceHistory(SEQUENCE_LENGTH)
 
 last_hand_time = None  # tracks continuous no-hands duration
+# Onset of the sign being read: when the hands came up, or when the previous
+# word was committed for signs made back to back
+sign_start = None
+
+# Bumped whenever the window is cleared, so results for older windows are ignored
+sequence_generation = 0
+live_label = "Reading..."
+live_conf = 0.0
+label_latency = LatencyStats('window to label')
+commit_latency = LatencyStats('sign to commit')
+stage_times = StageTimes()
+
+# Translucent bar at the bottom, text mirrored (only the text layer is flipped)
+caption_bar = CaptionBar(height=110, alpha=0.5, mirror=True)
+
+# Landmark tracker, behind the idle gate unless disabled
+print(f"Landmark tracker: {args.tracker} (analysis width: {args.analysis_width or 'native'})")
+tracker = create_tracker(args.tracker, args.model_complexity)
+hand_gate = None
+if IDLE_GATE and not args.no_idle_gate:
+    tracker = hand_gate = HandGate(tracker, IDLE_GATE_SECONDS, IDLE_CHECK_EVERY, IDLE_CHECK_WIDTH)
+
+recorder = KeypointRecorder() if args.record else None
+
+# main.py stops us with terminate(), route that through the cleanup below
+signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+try:
+    with tracker:
+        while cap.isOpened():
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                break
+            start = stage_times.lap('read', start)
+
+            now = time.time()
 
-with mp_holistic.Holistic(min_detection_confidence=0.5, min_tracking_confidence=0.5) as holistic:
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret or frame is None:
-            break
+            image, results = mediapipe_detection(frame, tracker, args.analysis_width)
+            start = stage_times.lap('detect', start)
+            # draw_landmarks(image, results) # No need to draw landmarks for the final version
 
-        now = time.time()
+            has_hands = hands_present(results)
 
-        image, results = mediapipe_detection(frame, holistic)
-        # draw_landmarks(image, results) # No need to draw landmarks for the final version
+            # track hand presence over last SEQUENCE_LENGTH frames
+            hand_history.append(has_hands)
 
-        has_hands = hands_present(results)
+            committed = ""
 
-        # track hand presence over last SEQUENCE_LENGTH frames
-        hand_history.append(has_hands)
-        hand_history = hand_history[-SEQUENCE_LENGTH:]
+            if not has_hands:
+                # start idle timer (continuous no-hands)
+                if last_hand_time is None:
+                    last_hand_time = now
 
-        committed = ""
-        live_label = "Reading..."
-        live_conf = 0.0
+                idle_for = now - last_hand_time
 
-        if not has_hands:
-            # start idle timer (continuous no-hands)
-            if last_hand_time is None:
-                last_hand_time = now
+                # clear sentence if idle too long
+                if idle_for >= CLEAR_IDLE_SECONDS:
+                    sentence.clear()
+                    smoother.forget_last_commit()  # allow repeats after a long idle
+                    reset_prediction_state()
 
-            idle_for = now - last_hand_time
+                if recorder is not None:
+                    recorder.add(now, False)
 
-            # clear sentence if idle too long
-            if idle_for >= CLEAR_IDLE_SECONDS:
-                sentence.clear()
-                last_commit = None  # allow repeats after a long idle
-                last_commit_time = None
+                sequence.clear()
+                sequence_generation += 1
+                stride.reset()
                 reset_prediction_state()
 
-            sequence.clear()
-            reset_prediction_state()
-
-            live_label = "(no hands visible)"
-            live_conf = 0.0
-
-        else:
-            # hands are back -> cancel idle timer
-            last_hand_time = None
-
-            keypoints = extract_keypoints(results)
-            if keypoints.shape[0] != FEATURE_DIM:
-                keypoints = np.zeros((FEATURE_DIM,), dtype=np.float32)
-
-            sequence.append(keypoints)
-            sequence = sequence[-SEQUENCE_LENGTH:]
-
-            live_label = "Reading..."
-            live_conf = 0.0
-
-            hands_enough = (sum(hand_history) / len(hand_history)) >= HAND_RATIO_THRESH
-
-            if hands_enough and len(sequence) == SEQUENCE_LENGTH:
-                x = np.array(sequence, dtype=np.float32)[None, ...]  # (1,30,258)
-                probs = model.predict(x, verbose=0)[0]
-                committed, live_label, live_conf = update_prediction(probs)
-
-                if committed:
-                    sentence.append(committed)
-                    sentence = sentence[-5:]
-                    # Speak the committed word
-                    speak_text(committed)
-
-        # --------------- UI OVERLAY ---------------
-        # Maybe hide this for the final version.
-        # Flip image to draw text mirrored, then flip back so video is normal
-        image = cv2.flip(image, 1)
-        
-        h, w = image.shape[:2]
-        
-        # Create overlay for semi-transparent rectangle at bottom
-        overlay = image.copy()
-        cv2.rectangle(overlay, (0, h - 110), (w, h), (0, 0, 0), -1)
-        alpha = 0.5  # Transparency: 0.0 = fully transparent, 1.0 = fully opaque
-        cv2.addWeighted(overlay, alpha, image, 1 - alpha, 0, image)
-
-        cv2.putText(
-            image,
-            f"Current word: {live_label}",
-            (10, h - 75),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.8,
-            (255, 255, 255),
-            2
-        )
-
-        cv2.putText(
-            image,
-            "Previous words: " + " ".join(sentence),
-            (10, h - 25),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1.2,
-            (255, 255, 255),
-            2
-        )
-
-        # Flip back so video is normal orientation but text remains mirrored
-        image = cv2.flip(image, 1)
-
-        # Send frame to virtual camera (convert BGR to RGB)
-        if virtual_cam is not None:
-            frame_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            virtual_cam.send(frame_rgb)
-            virtual_cam.sleep_until_next_frame()
-
-        if cv2.waitKey(10) & 0xFF == ord("q"):
-            break
-
-cap.release()
-if virtual_cam is not None:
-    virtual_cam.close()
-cv2.destroyAllWindows()
\ No newline at end of file
+                live_label = "(no hands visible)"
+                live_conf = 0.0
+
+            else:
+                # hands are back -> cancel idle timer
+                if last_hand_time is not None:
+                    live_label = "Reading..."
+                    live_conf = 0.0
+                if last_hand_time is not None or sign_start is None:
+                    sign_start = now
+                last_hand_time = None
+
+                # Write keypoints straight into the window (zeros if a landmark list is malformed)
+                extract_keypoints_into(results, sequence.slot())
+                if recorder is not None:
+                    recorder.add(now, True, sequence.slot())
+                sequence.commit()
+
+                hands_enough = hand_history.ratio() >= HAND_RATIO_THRESH
+
+                if hands_enough and sequence.full and stride.should_submit():
+                    # Hand the newest (1,30,258) window to the inference thread, it skips stale ones
+                    inference.submit(sequence.window(), (sequence_generation, now, sign_start))
+
+                # Use the newest classification if one finished since the last frame
+                result = inference.take_result()
+                if result is not None:
+                    probs, (generation, window_time, onset) = result
+                    if generation == sequence_generation:
+                        label_latency.add(time.time() - window_time)
+                        stride.update(int(np.argmax(probs)), float(np.max(probs)), inference.windows_skipped)
+                        committed, live_label, live_conf = update_prediction(probs)
+
+                    if committed:
+                        # A window submitted before the previous commit still carries that sign's onset
+                        commit_latency.add(time.time() - max(onset, sign_start))
+                        sign_start = now  # the next sign starts after this one
+                        if recorder is not None:
+                            recorder.add_commit(now, committed)
+                        sentence.append(committed)
+                        sentence = sentence[-5:]
+                        # Speak the committed word
+                        speak_text(committed)
+
+            start = stage_times.lap('sign', start)
+
+            # --------------- UI OVERLAY ---------------
+            # Maybe hide this for the final version.
+            # Text is mirrored, the video keeps its normal orientation
+            caption_bar.draw(image, [
+                (f"Current word: {live_label}", 10, 75, 0.8),
+                ("Previous words: " + " ".join(sentence), 10, 25, 1.2),
+            ])
+            start = stage_times.lap('overlay', start)
+
+            # Send frame to virtual camera (already RGB)
+            if virtual_cam is not None:
+                virtual_cam.send(image)
+                start = stage_times.lap('send', start)
+                virtual_cam.sleep_until_next_frame()
+
+            if cv2.waitKey(10) & 0xFF == ord("q"):
+                break
+except KeyboardInterrupt:
+    print("\nStopping...")
+finally:
+    inference.stop()
+    speech.stop()
+    print(f"Sign classifier ({model.name}) {model.latency}")
+    counts = inference.stats()
+    print(f"  windows: {counts['submitted']} submitted, {counts['classified']} classified, "
+          f"{counts['skipped']} skipped as stale, "
+          f"{stride.frames_per_inference():.1f} frames per inference")
+    print(f"  {label_latency}")
+    print(f"  {commit_latency}")
+    if hand_gate is not None:
+        hand_gate.print_stats()
+    speech.print_stats()
+    print("Frame time breakdown:")
+    print(stage_times)
+    if recorder is not None and len(recorder):
+        recorder.save(args.record)
+        print(f"[OK] Recorded {len(recorder)} frames to {args.record}")
+    cap.release()
+    if virtual_cam is not None:
+        virtual_cam.close()
+    cv2.destroyAllWindows()
@@ -0,0 +1,223 @@
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Overflow policies for AudioRingBuffer
+DROP_OLDEST = 'drop-oldest'
+FINAL_ONLY = 'final-only'
+OVERFLOW_POLICIES = (DROP_OLDEST, FINAL_ONLY)
+
+# With FINAL_ONLY, a backlog above this fraction of the buffer skips partials
+FINAL_ONLY_HIGH_WATER = 0.5
+
+
+class AudioRingBuffer:
+    """Preallocated int16 ring buffer between the audio callback and Vosk
+
+    The buffer holds at most max_latency seconds of audio, so a slow recognizer
+    can never make memory or caption delay grow without limit. When it is full
+    the oldest audio is overwritten and counted as an overrun. With the
+    FINAL_ONLY policy the consumer is also told to stop asking for partial
+    results while it is behind, which is usually enough to catch up.
+    """
+
+    def __init__(self, max_latency=2.0, sample_rate=16000, policy=DROP_OLDEST, chunk_samples=4000):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}', expected one of {OVERFLOW_POLICIES}")
+        self.sample_rate = sample_rate
+        self.policy = policy
+        self.chunk_samples = chunk_samples
+        self.capacity = max(int(max_latency * sample_rate), chunk_samples)
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+
+        # Absolute sample positions, the ring index is position % capacity
+        self._read_pos = 0
+        self._write_pos = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.overruns = 0
+        self.dropped_samples = 0
+
+    def write(self, data):
+        """Copy a block of int16 audio into the ring (called from the audio callback)"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        with self._cond:
+            # Make room by dropping the oldest unread audio
+            overflow = (self._write_pos - self._read_pos) + len(samples) - self.capacity
+            if overflow > 0:
+                self.overruns += 1
+                self.dropped_samples += overflow
+                if len(samples) > self.capacity:
+                    samples = samples[-self.capacity:]
+                    self._read_pos = self._write_pos
+                else:
+                    self._read_pos += overflow
+            n = len(samples)
+
+            start = self._write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._buffer[start:start + first] = samples[:first]
+            self._buffer[:n - first] = samples[first:]
+            self._write_pos += n
+            self._cond.notify()
+
+    def read(self):
+        """Block until audio is available and return (chunks, behind)
+
+        chunks is a list of bytes objects of at most chunk_samples each, holding
+        all audio written so far. behind is True when the FINAL_ONLY policy wants
+        the consumer to skip partial results. Returns (None, False) once the
+        buffer has been closed and drained.
+        """
+        with self._cond:
+            while self._read_pos == self._write_pos and not self._closed:
+                self._cond.wait()
+            backlog = self._write_pos - self._read_pos
+            if backlog == 0:
+                return None, False
+
+            chunks = []
+            while self._read_pos < self._write_pos:
+                start = self._read_pos % self.capacity
+                n = min(self.chunk_samples, self._write_pos - self._read_pos, self.capacity - start)
+                chunks.append(self._buffer[start:start + n].tobytes())
+                self._read_pos += n
+
+        behind = self.policy == FINAL_ONLY and backlog > self.capacity * FINAL_ONLY_HIGH_WATER
+        return chunks, behind
+
+    def close(self):
+        """Wake up any reader and make read() return None once drained"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def backlog_seconds(self):
+        """Seconds of audio waiting to be read"""
+        with self._cond:
+            return (self._write_pos - self._read_pos) / self.sample_rate
+
+    def dropped_seconds(self):
+        """Seconds of audio lost to overruns so far"""
+        return self.dropped_samples / self.sample_rate
+
+
+class TranscriptionWorker:
+    """Blocking consumer that feeds buffered audio to a Vosk recognizer
+
+    The worker sleeps on the ring buffer while there is no audio, so it costs
+    no CPU when idle. Every time it wakes up it drains everything that piled up
+    and only reads the partial result once per batch, since intermediate
+    partials would be overwritten straight away anyway.
+    """
+
+    def __init__(self, recognizer, audio_buffer, on_final, on_partial, bytes_per_sample=2):
+        self.recognizer = recognizer
+        self.audio_buffer = audio_buffer
+        self.on_final = on_final
+        self.on_partial = on_partial
+        self.bytes_per_sample = bytes_per_sample
+        self.sample_rate = audio_buffer.sample_rate
+
+        self.chunks_processed = 0
+        self.batches_processed = 0
+        self.final_only_batches = 0
+        self.audio_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.start_time = None
+
+        self._thread = None
+        self._reported_overruns = 0
+
+    def start(self):
+        """Start the worker thread"""
+        self.start_time = time.time()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Close the buffer and wait for the worker to finish what is left"""
+        self.audio_buffer.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        """Thread function to continuously transcribe audio using Vosk"""
+        while True:
+            batch, behind = self.audio_buffer.read()
+            if batch is None:
+                break
+
+            cpu_start = time.thread_time()
+            try:
+                self.process_batch(batch, partials=not behind)
+            except Exception as e:
+                print(f"Transcription error: {e}")
+            self.cpu_seconds += time.thread_time() - cpu_start
+
+            self.report_overruns()
+
+    def process_batch(self, batch, partials=True):
+        """Run a batch of raw int16 chunks through the recognizer"""
+        if not batch:
+            return
+
+        for data in batch:
+            if self.recognizer.AcceptWaveform(data):
+                # Final result - complete sentence/phrase
+                result = json.loads(self.recognizer.Result())
+                text = result.get("text", "").strip()
+                if text:
+                    self.on_final(text)
+            self.chunks_processed += 1
+            self.audio_seconds += len(data) / (self.bytes_per_sample * self.sample_rate)
+        self.batches_processed += 1
+
+        if not partials:
+            # Falling behind, decode finals only until we catch up
+            self.final_only_batches += 1
+            return
+
+        # Only the newest partial matters, older ones would be replaced immediately
+        partial = json.loads(self.recognizer.PartialResult())
+        partial_text = partial.get("partial", "").strip()
+        if partial_text:
+            self.on_partial(partial_text)
+
+    def report_overruns(self):
+        """Warn (outside the audio callback) when the ring buffer dropped audio"""
+        overruns = self.audio_buffer.overruns
+        if overruns != self._reported_overruns:
+            self._reported_overruns = overruns
+            print(f"Audio overrun: {self.audio_buffer.dropped_seconds():.2f}s dropped so far "
+                  f"({overruns} overruns) - recognizer can't keep up, "
+                  f"consider a larger --max-latency or a faster machine", file=sys.stderr)
+
+    def stats(self):
+        """Return throughput counters for the worker"""
+        elapsed = time.time() - self.start_time if self.start_time else 0.0
+        return {
+            'backlog_seconds': self.audio_buffer.backlog_seconds(),
+            'chunks_processed': self.chunks_processed,
+            'chunks_per_second': self.chunks_processed / elapsed if elapsed else 0.0,
+            'chunks_per_batch': self.chunks_processed / max(self.batches_processed, 1),
+            'audio_seconds': self.audio_seconds,
+            'cpu_per_audio_second': self.cpu_seconds / self.audio_seconds if self.audio_seconds else 0.0,
+            'final_only_batches': self.final_only_batches,
+            'overruns': self.audio_buffer.overruns,
+            'dropped_seconds': self.audio_buffer.dropped_seconds(),
+        }
+
+    def print_stats(self):
+        """Print a one-line summary of the worker counters"""
+        s = self.stats()
+        print(f"Transcription stats: backlog {s['backlog_seconds']:.2f}s, "
+              f"{s['chunks_per_second']:.1f} chunks/s ({s['chunks_per_batch']:.1f} per batch), "
+              f"{s['audio_seconds']:.1f}s audio, "
+              f"{s['cpu_per_audio_second'] * 1000:.1f} ms CPU per second of audio, "
+              f"{s['overruns']} overruns ({s['dropped_seconds']:.2f}s dropped), "
+              f"{s['final_only_batches']} final-only batches")
@@ -0,0 +1,72 @@
+# ============================================================
+# Keypoint extraction micro-benchmark
+# - Compares extract_keypoints (list based, original) with
+#   extract_keypoints_into (writes into the sequence buffer)
+# - Uses synthetic MediaPipe results, no webcam needed
+#
+#   python bench/bench_keypoints.py [--iterations N]
+# ============================================================
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from types import SimpleNamespace
+
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from keypoints import FEATURE_DIM, KeypointWindow, extract_keypoints, extract_keypoints_into
+
+
+def make_landmarks(count, with_visibility):
+    """Random NormalizedLandmarkList like the ones Holistic returns"""
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for _ in range(count):
+        lm = landmarks.landmark.add()
+        lm.x, lm.y, lm.z = random.random(), random.random(), random.random() - 0.5
+        if with_visibility:
+            lm.visibility, lm.presence = random.random(), random.random()
+    return landmarks
+
+
+def make_results(pose=True, left=True, right=True):
+    return SimpleNamespace(
+        pose_landmarks=make_landmarks(33, True) if pose else None,
+        left_hand_landmarks=make_landmarks(21, False) if left else None,
+        right_hand_landmarks=make_landmarks(21, False) if right else None,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark keypoint extraction')
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    cases = {
+        'pose + both hands': make_results(),
+        'pose + right hand': make_results(left=False),
+        'pose only': make_results(left=False, right=False),
+    }
+    window = KeypointWindow()
+
+    print(f"{'case':<20} {'extract_keypoints':>18} {'extract_keypoints_into':>24} {'speedup':>8}")
+    for name, results in cases.items():
+        # Both paths must produce the same features
+        extract_keypoints_into(results, window.slot())
+        assert window.slot().shape == (FEATURE_DIM,)
+        assert np.array_equal(window.slot(), extract_keypoints(results)), name
+
+        def new():
+            extract_keypoints_into(results, window.slot())
+            window.commit()
+
+        old_us = timeit.timeit(lambda: extract_keypoints(results), number=args.iterations) / args.iterations * 1e6
+        new_us = timeit.timeit(new, number=args.iterations) / args.iterations * 1e6
+        print(f"{name:<20} {old_us:>15.1f} us {new_us:>21.1f} us {old_us / new_us:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+# ============================================================
+# End-to-end benchmark of both pipelines, no devices needed
+# - Feeds recorded or synthetic video / audio through the hot
+#   paths of speech_to_text.py and asl.py:
+#     speech: wrap_text, add_caption, caption_sprite,
+#             transcribe_audio (Vosk through TranscriptionWorker)
+#     asl:    mediapipe_detection, extract_keypoints,
+#             model.predict, update_prediction, caption_bar
+# - Reports us/frame (p50 / p99 / mean) and memory allocated per
+#   call (tracemalloc, separate pass) for every stage, and the
+#   fps of each pipeline's per-frame loop run end to end
+# - Stages whose dependencies or models are missing are skipped
+# - --json saves the results, --compare checks them against an
+#   earlier run and exits with 1 on a regression
+#
+#   python bench/bench_pipelines.py --video signing.mp4 --audio speech.wav --json bench.json
+#   python bench/bench_pipelines.py --compare bench.json --threshold 0.15
+# ============================================================
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import wave
+
+import cv2
+import numpy as np
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+from captions import CaptionBar, CaptionSprite, add_caption, wrap_text
+from keypoints import FEATURE_DIM, SEQUENCE_LENGTH, KeypointWindow, extract_keypoints_into
+from perf import LatencyStats
+from smoothing import PredictionSmoother
+
+FPS = 30.0
+SAMPLE_RATE = 16000
+BLOCK_SIZE = 4000        # speech_to_text.BLOCK_SIZE, one audio chunk per call
+ALLOCATION_CALLS = 100   # calls traced with tracemalloc per stage
+CAPTION = ("so the plan for next week is to finish the caption renderer first and then "
+           "move on to the translation cache before the release")
+
+
+def load_frames(video, count):
+    """Up to count BGR frames of a video, or synthetic 720p frames"""
+    if not video:
+        # Smooth moving gradient, something for the detectors to look at
+        y, x = np.mgrid[0:720, 0:1280]
+        return [np.dstack([(x + 8 * i) % 256, (y + 4 * i) % 256, np.full_like(x, 128)]).astype(np.uint8)
+                for i in range(min(count, 60))]
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"Error: Could not read frames from {video}")
+    return frames
+
+
+def load_audio(path, seconds):
+    """int16 mono samples of a recording, or synthetic noise with speech-like bursts"""
+    if path:
+        # The stdlib reader is enough here, transcribe_file.AudioSource would pull in vosk
+        try:
+            with wave.open(path, 'rb') as f:
+                if f.getsampwidth() != 2:
+                    raise wave.Error(f"{8 * f.getsampwidth()}-bit audio, expected 16-bit PCM")
+                sample_rate, channels = f.getframerate(), f.getnchannels()
+                data = f.readframes(int(seconds * sample_rate))
+        except (OSError, EOFError, wave.Error) as e:
+            raise SystemExit(f"Error: Could not read {path}: {e}")
+        if sample_rate != SAMPLE_RATE:
+            raise SystemExit(f"Error: {path} is {sample_rate} Hz, the recognizer expects {SAMPLE_RATE} Hz")
+        return np.frombuffer(data, dtype='<i2').reshape(-1, channels).mean(axis=1).astype(np.int16)
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = (np.sin(2 * np.pi * 0.5 * t) > 0).astype(np.float32)
+    signal = 3000 * envelope * np.sin(2 * np.pi * 220 * t) + rng.normal(0, 300, len(t))
+    return signal.astype(np.int16)
+
+
+def caption_stream(count):
+    """The caption shown on each frame, a partial result growing by a word every few frames"""
+    words = CAPTION.split()
+    return [" ".join(words[:1 + (i // 8) % len(words)]) for i in range(count)]
+
+
+# --------------- MEASURING ---------------
+def measure(name, fn, calls):
+    """Time fn(i) for i in range(calls), then trace allocations of a few calls"""
+    latency = LatencyStats(name, maxlen=calls)
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        latency.add(time.perf_counter() - start)
+
+    traced = min(calls, ALLOCATION_CALLS)
+    allocated = 0
+    tracemalloc.start()
+    for i in range(traced):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn(i)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    return {
+        'calls': calls,
+        'us_p50': latency.percentile(50) * 1e6,
+        'us_p99': latency.percentile(99) * 1e6,
+        'us_mean': latency.mean() * 1e6,
+        'alloc_kb': allocated / traced / 1024,
+    }
+
+
+def skipped(name, error):
+    print(f"Warning: skipping {name} ({error})")
+
+
+# --------------- SPEECH PIPELINE ---------------
+def speech_stages(frames, audio, args, results):
+    captions = caption_stream(args.frames)
+    font = cv2.FONT_HERSHEY_DUPLEX
+    scratch = frames[0].copy()
+    max_width = int(scratch.shape[1] * 0.85)
+
+    results['wrap_text'] = measure(
+        'wrap_text', lambda i: wrap_text(captions[i], font, 1.0, 2, max_width), args.frames)
+    results['add_caption'] = measure(
+        'add_caption', lambda i: add_caption(scratch, captions[i], scratch.shape[0] - 50, font, 1.0,
+                                             (255, 255, 255), 2, (0, 0, 0), 4), args.frames)
+    sprite = CaptionSprite(font, 1.0, (255, 255, 255), 2, (0, 0, 0), 4, mirror=True)
+    results['caption_sprite'] = measure(
+        'caption_sprite', lambda i: sprite.draw(scratch, captions[i], scratch.shape[0] - 50), args.frames)
+
+    try:
+        results['transcribe_audio'] = measure_transcription(audio, args)
+    except Exception as e:
+        skipped('transcribe_audio', e)
+
+    # The video loop of speech_to_text.py: caption on every frame (transcription has its own thread)
+    sprite = CaptionSprite(font, 1.0, (255, 255, 255), 2, (0, 0, 0), 4, mirror=True)
+    start = time.perf_counter()
+    for i in range(args.frames):
+        np.copyto(scratch, frames[i % len(frames)])
+        sprite.draw(scratch, captions[i], scratch.shape[0] - 50)
+    return args.frames / (time.perf_counter() - start)
+
+
+def measure_transcription(audio, args):
+    """TranscriptionWorker.process_batch on one BLOCK_SIZE chunk per call"""
+    from vosk import KaldiRecognizer, Model, SetLogLevel
+    from audio_pipeline import AudioRingBuffer, TranscriptionWorker
+    from vosk_models import vosk_model_path
+
+    model_dir = args.vosk_model or str(vosk_model_path('en'))
+    if not os.path.isdir(model_dir):
+        raise OSError(f"no Vosk model at {model_dir}, pass --vosk-model")
+    SetLogLevel(-1)
+    recognizer = KaldiRecognizer(Model(model_dir), SAMPLE_RATE)
+    recognizer.SetWords(True)
+    worker = TranscriptionWorker(recognizer, AudioRingBuffer(sample_rate=SAMPLE_RATE),
+                                 on_final=lambda text: None, on_partial=lambda text: None)
+    chunks = [audio[i:i + BLOCK_SIZE].tobytes() for i in range(0, len(audio) - BLOCK_SIZE + 1, BLOCK_SIZE)]
+    result = measure('transcribe_audio', lambda i: worker.process_batch([chunks[i % len(chunks)]]), len(chunks))
+    # Audio seconds per CPU second, below 1 the recognizer can't keep up live
+    result['realtime_factor'] = (BLOCK_SIZE / SAMPLE_RATE) / (result['us_mean'] / 1e6)
+    return result
+
+
+# --------------- ASL PIPELINE ---------------
+def asl_stages(frames, args, results):
+    with open(os.path.join(root_dir, 'actions.json'), 'r') as f:
+        actions = json.load(f)
+    rng = np.random.default_rng(0)
+
+    tracker = None
+    detections = None
+    try:
+        from trackers import analysis_frame, create_tracker
+        tracker = create_tracker(args.tracker)
+
+        def mediapipe_detection(frame_bgr):
+            # Same as asl.py: one color conversion, detect on the analysis copy
+            image = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+            image.flags.writeable = False
+            results = tracker.process(analysis_frame(image, args.analysis_width))
+            image.flags.writeable = True
+            return image, results
+
+        mediapipe_detection(frames[0])  # load the graph before timing
+        results['mediapipe_detection'] = measure(
+            'mediapipe_detection', lambda i: mediapipe_detection(frames[i % len(frames)]), args.frames)
+        detections = [mediapipe_detection(frame)[1] for frame in frames[:SEQUENCE_LENGTH]]
+    except Exception as e:
+        tracker = None
+        skipped('mediapipe_detection', e)
+
+    if detections is None or not any(r.pose_landmarks for r in detections):
+        # Blank or synthetic frames have no landmarks, time extraction on synthetic ones
+        try:
+            from bench_keypoints import make_results
+            detections = [make_results() for _ in range(SEQUENCE_LENGTH)]
+        except Exception as e:
+            detections = None
+            skipped('extract_keypoints', e)
+    if detections is not None:
+        window = KeypointWindow(SEQUENCE_LENGTH, FEATURE_DIM)
+
+        def extract(i):
+            extract_keypoints_into(detections[i % len(detections)], window.slot())
+            window.commit()
+        results['extract_keypoints'] = measure('extract_keypoints', extract, args.frames)
+
+    model = None
+    windows = rng.random((8, 1, SEQUENCE_LENGTH, FEATURE_DIM), dtype=np.float32)
+    try:
+        from sign_model import load_classifier
+        model = load_classifier(os.path.join(root_dir, 'wlasl_demo.keras'),
+                                os.path.join(root_dir, 'wlasl_demo.tflite'))
+        results['model.predict'] = measure('model.predict', lambda i: model.predict(windows[i % len(windows)]),
+                                           args.frames)
+        results['model.predict']['backend'] = model.name
+    except Exception as e:
+        skipped('model.predict', e)
+
+    # A sign held for a second, then the next one: commits and holds both get exercised
+    probs = rng.dirichlet(np.ones(len(actions)) * 0.3, size=args.frames).astype(np.float32)
+    for i in range(args.frames):
+        probs[i, (i // 30) % len(actions)] += 2.0
+    probs /= probs.sum(axis=1, keepdims=True)
+    smoother = PredictionSmoother(actions)
+    results['update_prediction'] = measure(
+        'update_prediction', lambda i: smoother.update(probs[i], i / FPS), args.frames)
+
+    bar = CaptionBar(height=110, alpha=0.5, mirror=True)
+    scratch = cv2.cvtColor(frames[0], cv2.COLOR_BGR2RGB)
+    words = ["hello", "thank you", "yes", "question", "agree"]
+
+    def overlay(i):
+        bar.draw(scratch, [(f"Current word: {words[(i // 30) % len(words)]}", 10, 75, 0.8),
+                           ("Previous words: " + " ".join(words[:(i // 60) % len(words)]), 10, 25, 1.2)])
+    results['caption_bar'] = measure('caption_bar', overlay, args.frames)
+
+    if tracker is None or model is None:
+        skipped('asl end to end', 'needs mediapipe and the classifier')
+        return None
+
+    # The per-frame work of the asl.py loop, with classification inline instead of on its thread
+    window = KeypointWindow(SEQUENCE_LENGTH, FEATURE_DIM)
+    smoother = PredictionSmoother(actions)
+    start = time.perf_counter()
+    for i in range(args.frames):
+        image, detection = mediapipe_detection(frames[i % len(frames)])
+        extract_keypoints_into(detection, window.slot())
+        window.commit()
+        if window.full:
+            smoother.update(model.predict(window.window()), i / FPS)
+        overlay(i)
+    fps = args.frames / (time.perf_counter() - start)
+    tracker.close()
+    return fps
+
+
+# --------------- RESULTS ---------------
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root_dir, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_results(report):
+    print(f"\n{'stage':<22} {'p50':>10} {'p99':>10} {'mean':>10} {'alloc/call':>12}")
+    for name, s in report['stages'].items():
+        print(f"{name:<22} {s['us_p50']:>7.1f} us {s['us_p99']:>7.1f} us {s['us_mean']:>7.1f} us "
+              f"{s['alloc_kb']:>9.1f} KB")
+    if 'transcribe_audio' in report['stages']:
+        print(f"\ntranscribe_audio: {report['stages']['transcribe_audio']['realtime_factor']:.1f}x real time")
+    print("\nEnd to end:")
+    for name, fps in report['end_to_end'].items():
+        print(f"  {name}: {fps:.1f} fps" if fps else f"  {name}: skipped")
+
+
+def compare(report, baseline_path, threshold):
+    """Print changes against an earlier run, returns the stages that got slower than threshold"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    print(f"\nAgainst {baseline_path} ({baseline['meta'].get('revision')}, {baseline['meta'].get('time')}):")
+    regressions = []
+    for name, s in report['stages'].items():
+        old = baseline['stages'].get(name)
+        if old is None:
+            continue
+        change = s['us_p50'] / old['us_p50'] - 1 if old['us_p50'] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  <-- slower"
+        print(f"  {name:<22} {old['us_p50']:>9.1f} -> {s['us_p50']:>9.1f} us ({change * 100:+.0f}%){flag}")
+    for name, fps in report['end_to_end'].items():
+        old = baseline['end_to_end'].get(name)
+        if fps and old:
+            change = fps / old - 1
+            flag = ""
+            if change < -threshold:
+                regressions.append(name)
+                flag = "  <-- slower"
+            print(f"  {name:<22} {old:>9.1f} -> {fps:>9.1f} fps ({change * 100:+.0f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of both pipelines without devices')
+    parser.add_argument('--video', help='Recorded clip to feed both pipelines (default: synthetic frames)')
+    parser.add_argument('--audio', help='16 kHz WAV to transcribe (default: synthetic audio)')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--audio-seconds', type=float, default=30.0)
+    # trackers.TRACKERS, not imported here so the speech stages run without mediapipe
+    parser.add_argument('--tracker', choices=('holistic', 'hands-pose'), default='holistic')
+    parser.add_argument('--analysis-width', type=int, default=0)
+    parser.add_argument('--vosk-model', help='Vosk model directory (default: the English model in models/vosk)')
+    parser.add_argument('--pipeline', choices=['both', 'speech', 'asl'], default='both')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown counted as a regression (default: 0.10)')
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    print(f"{len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}, {args.frames} per stage")
+
+    stages = {}
+    end_to_end = {}
+    if args.pipeline in ('both', 'speech'):
+        audio = load_audio(args.audio, args.audio_seconds)
+        end_to_end['speech video loop'] = speech_stages(frames, audio, args, stages)
+    if args.pipeline in ('both', 'asl'):
+        end_to_end['asl frame loop'] = asl_stages(frames, args, stages)
+
+    report = {
+        'meta': {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'video': args.video,
+            'audio': args.audio,
+            'frames': args.frames,
+            'frame_size': [frames[0].shape[1], frames[0].shape[0]],
+        },
+        'stages': stages,
+        'end_to_end': end_to_end,
+    }
+    print_results(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.compare:
+        regressions = compare(report, args.compare, args.threshold)
+        if regressions:
+            print(f"\nRegressions over {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
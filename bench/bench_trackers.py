@@ -0,0 +1,131 @@
+# ============================================================
+# Landmark tracker benchmark
+# - Runs every tracker in trackers.py over the same frames and
+#   reports ms/frame and how often pose / hands were found
+# - Compares the 258-dim features against Holistic on frames
+#   where both trackers found the same parts
+# - With --widths, also runs one tracker at several analysis
+#   resolutions and compares against native resolution
+#   (speed vs landmark accuracy)
+# - Use a recorded clip of someone signing, without --video it
+#   falls back to blank frames (detector cost only)
+#
+#   python bench/bench_trackers.py --video signing.mp4 [--frames N]
+#   python bench/bench_trackers.py --video signing.mp4 --widths 960,640,480
+# ============================================================
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from keypoints import FEATURE_DIM, HAND_SIZE, POSE_SIZE, extract_keypoints_into
+from perf import LatencyStats
+from trackers import HOLISTIC, TRACKERS, create_tracker, prepare_frame
+
+
+def load_frames(video, count):
+    """Up to count BGR frames from a video file, or blank 720p frames"""
+    if not video:
+        print("Warning: no --video given, using blank frames (no landmarks are found, "
+              "so this only measures the detectors)")
+        return [np.zeros((720, 1280, 3), dtype=np.uint8) for _ in range(count)]
+
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"Error: Could not read frames from {video}")
+    return frames
+
+
+def run_tracker(name, frames, model_complexity=None, analysis_width=0):
+    """Per-frame latency (color conversion included), features and detection flags of one tracker"""
+    latency = LatencyStats(name)
+    features = np.zeros((len(frames), FEATURE_DIM), dtype=np.float32)
+    found = np.zeros((len(frames), 3), dtype=bool)  # pose, left hand, right hand
+
+    with create_tracker(name, model_complexity) as tracker:
+        tracker.process(prepare_frame(frames[0], analysis_width))  # load the graph before timing
+        for i, frame in enumerate(frames):
+            start = time.perf_counter()
+            results = tracker.process(prepare_frame(frame, analysis_width))
+            latency.add(time.perf_counter() - start)
+            extract_keypoints_into(results, features[i])
+            found[i] = (results.pose_landmarks is not None,
+                        results.left_hand_landmarks is not None,
+                        results.right_hand_landmarks is not None)
+    return latency, features, found
+
+
+PARTS = {'pose': slice(0, POSE_SIZE),
+         'left hand': slice(POSE_SIZE, POSE_SIZE + HAND_SIZE),
+         'right hand': slice(POSE_SIZE + HAND_SIZE, FEATURE_DIM)}
+
+
+def print_runs(runs, base):
+    """Latency and detection rate table, speedup relative to runs[base]"""
+    base_latency = runs[base][0]
+    print(f"{'run':<16} {'p50':>9} {'p99':>9} {'speedup':>8} {'pose':>6} {'left':>6} {'right':>6}")
+    for name, (latency, _, found) in runs.items():
+        pose, left, right = found.mean(axis=0) * 100
+        print(f"{name:<16} {latency.percentile(50) * 1000:>6.1f} ms {latency.percentile(99) * 1000:>6.1f} ms "
+              f"{base_latency.mean() / latency.mean():>7.2f}x {pose:>5.0f}% {left:>5.0f}% {right:>5.0f}%")
+
+
+def compare_features(runs, base):
+    """Feature differences of every run against runs[base], on frames where both found a part"""
+    _, base_features, base_found = runs[base]
+    for name, (_, features, found) in runs.items():
+        if name == base:
+            continue
+        print(f"\n{name} vs {base}:")
+        print(f"  same parts found on {np.all(found == base_found, axis=1).mean() * 100:.0f}% of frames")
+        for column, (part, columns) in enumerate(PARTS.items()):
+            both = found[:, column] & base_found[:, column]
+            if not both.any():
+                print(f"  {part}: not found by both on any frame")
+                continue
+            diff = np.abs(features[both, columns] - base_features[both, columns])
+            print(f"  {part}: mean abs difference {diff.mean():.4f} over {both.sum()} frames")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the landmark trackers')
+    parser.add_argument('--video', help='Recorded clip to run the trackers on')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--model-complexity', type=int, choices=[0, 1, 2], default=None)
+    parser.add_argument('--tracker', choices=TRACKERS, default=HOLISTIC,
+                        help='Tracker used for the --widths comparison (default: holistic)')
+    parser.add_argument('--widths', help='Comma separated analysis widths to compare against native, e.g. 960,640,480')
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    print(f"{len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}\n")
+
+    runs = {name: run_tracker(name, frames, args.model_complexity) for name in TRACKERS}
+    print_runs(runs, HOLISTIC)
+    compare_features(runs, HOLISTIC)
+
+    if args.widths:
+        # Speed vs accuracy of detecting on a downscaled copy, native resolution is the reference
+        native = f"{args.tracker} native"
+        widths = {native: runs[args.tracker]}
+        for width in (int(w) for w in args.widths.split(',')):
+            widths[f"{args.tracker} {width}"] = run_tracker(args.tracker, frames, args.model_complexity, width)
+        print(f"\nAnalysis resolution ({args.tracker}):")
+        print_runs(widths, native)
+        compare_features(widths, native)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+import collections
+
+import cv2
+import numpy as np
+
+MAX_TEXT_WIDTH_RATIO = 0.85  # Maximum text width as ratio of frame width
+
+
+class GlyphTable:
+    """Per-character advance widths for one font, scale and thickness
+
+    Hershey text width is (almost exactly) the sum of the glyph advances plus a
+    constant pad for the stroke thickness, so once a character has been
+    measured, any string made of known characters can be measured without
+    calling cv2.getTextSize again.
+    """
+
+    def __init__(self, font, scale, thickness):
+        self.font = font
+        self.scale = scale
+        self.thickness = thickness
+        self._advances = {}
+        (x_width, _), _ = cv2.getTextSize("x", font, scale, thickness)
+        self.pad = x_width - self.advance("x")
+
+    def advance(self, char):
+        """Horizontal advance of a single character"""
+        adv = self._advances.get(char)
+        if adv is None:
+            # Measure a run of the glyph so rounding doesn't skew the advance
+            (w1, _), _ = cv2.getTextSize(char, self.font, self.scale, self.thickness)
+            (w9, _), _ = cv2.getTextSize(char * 9, self.font, self.scale, self.thickness)
+            adv = (w9 - w1) / 8
+            self._advances[char] = adv
+        return adv
+
+    def measure(self, text):
+        """Sum of the advances of text, without the thickness pad"""
+        return sum(self.advance(char) for char in text)
+
+    def width(self, text):
+        """Estimated rendered width of text, matches cv2.getTextSize"""
+        return round(self.measure(text) + self.pad) if text else 0
+
+
+class _WrapState:
+    """Where greedy wrapping stopped, so a longer caption can carry on from it"""
+
+    def __init__(self):
+        self.words_done = 0
+        self.lines = []
+        self.current_line = []
+        self.current_advance = 0.0
+
+    def copy(self):
+        state = _WrapState()
+        state.words_done = self.words_done
+        state.lines = list(self.lines)
+        state.current_line = list(self.current_line)
+        state.current_advance = self.current_advance
+        return state
+
+
+def _wrap_words(words, table, max_width, state):
+    """Greedily add words[state.words_done:] to the wrap state"""
+    space = table.advance(' ')
+    for word in words[state.words_done:]:
+        word_advance = table.measure(word)
+        # Test line with new word
+        if state.current_line:
+            test_advance = state.current_advance + space + word_advance
+        else:
+            test_advance = word_advance
+
+        if round(test_advance + table.pad) <= max_width:
+            # Word fits on current line
+            state.current_line.append(word)
+            state.current_advance = test_advance
+        else:
+            # Word doesn't fit, start new line
+            if state.current_line:
+                state.lines.append(' '.join(state.current_line))
+            # Handle very long single word (break at character level)
+            if round(word_advance + table.pad) > max_width:
+                char_line = ""
+                char_advance = 0.0
+                for char in word:
+                    test_char_advance = char_advance + table.advance(char)
+                    if round(test_char_advance + table.pad) > max_width and char_line:
+                        state.lines.append(char_line)
+                        char_line = char
+                        char_advance = table.advance(char)
+                    else:
+                        char_line += char
+                        char_advance = test_char_advance
+                state.current_line = [char_line] if char_line else []
+                state.current_advance = char_advance
+            else:
+                state.current_line = [word]
+                state.current_advance = word_advance
+        state.words_done += 1
+    return state
+
+
+class CaptionLayoutCache:
+    """Caches wrapped caption lines and their widths
+
+    Layouts are keyed by (text, font, scale, thickness, max width), so a
+    caption that stays on screen for seconds is wrapped once instead of on
+    every frame. Greedy wrapping never revisits finished lines, so when a
+    partial result grows by a few words the previous layout is resumed instead
+    of starting over.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._layouts = collections.OrderedDict()
+        self._tables = {}
+        self._last_wrap = {}  # (font, scale, thickness, max_width) -> (words, _WrapState)
+
+        self.hits = 0
+        self.misses = 0
+        self.resumed = 0
+
+    def glyph_table(self, font, scale, thickness):
+        """Get the glyph table for a font setting, building it on first use"""
+        key = (font, scale, thickness)
+        table = self._tables.get(key)
+        if table is None:
+            table = self._tables[key] = GlyphTable(font, scale, thickness)
+        return table
+
+    def wrap(self, text, font, scale, thickness, max_width):
+        """Wrap text into lines, resuming the previous wrap when text extends it"""
+        words = text.split()
+        table = self.glyph_table(font, scale, thickness)
+        setting = (font, scale, thickness, max_width)
+
+        last = self._last_wrap.get(setting)
+        if last is not None and words[:len(last[0])] == last[0]:
+            state = last[1].copy()
+            self.resumed += 1
+        else:
+            state = _WrapState()
+        _wrap_words(words, table, max_width, state)
+        self._last_wrap[setting] = (words, state.copy())
+
+        lines = list(state.lines)
+        if state.current_line:
+            lines.append(' '.join(state.current_line))
+        return lines
+
+    def layout(self, text, font, scale, thickness, max_width):
+        """Return (lines, line_widths, line_height) for a caption"""
+        key = (text, font, scale, thickness, max_width)
+        cached = self._layouts.get(key)
+        if cached is not None:
+            self._layouts.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        lines = self.wrap(text, font, scale, thickness, max_width)
+        if not lines and text.split():
+            lines = [text]  # Fallback to original text if wrapping fails
+        widths = [cv2.getTextSize(line, font, scale, thickness)[0][0] for line in lines]
+        (_, text_height), baseline = cv2.getTextSize("Ay", font, scale, thickness)
+        line_height = text_height + baseline + 5  # Add small padding between lines
+
+        cached = (lines, widths, line_height)
+        self._layouts[key] = cached
+        if len(self._layouts) > self.maxsize:
+            self._layouts.popitem(last=False)
+        return cached
+
+
+caption_layouts = CaptionLayoutCache()
+
+def wrap_text(text, font, scale, thickness, max_width):
+    """Wrap text at word boundaries to fit within max_width"""
+    return list(caption_layouts.layout(text, font, scale, thickness, max_width)[0])
+
+def add_caption(frame, text, y_position, font, scale, color, thickness, outline_color, outline_thickness,
+                max_width_ratio=MAX_TEXT_WIDTH_RATIO):
+    """Add text caption with outline to frame, centered horizontally, with word wrapping"""
+    if not text:
+        return frame
+
+    frame_width = frame.shape[1]
+    max_text_width = int(frame_width * max_width_ratio)
+
+    # Wrap text into lines (cached until the caption changes)
+    lines, widths, line_height = caption_layouts.layout(text, font, scale, thickness, max_text_width)
+
+    # Draw lines from bottom up
+    current_y = y_position
+    for line, text_width in zip(reversed(lines), reversed(widths)):  # Draw last line first (at bottom)
+        # Center horizontally
+        x_position = (frame_width - text_width) // 2
+        position = (x_position, current_y)
+
+        # Draw outline (thicker, darker)
+        cv2.putText(frame, line, position, font, scale, outline_color, outline_thickness, cv2.LINE_AA)
+        # Draw main text (thinner, brighter)
+        cv2.putText(frame, line, position, font, scale, color, thickness, cv2.LINE_AA)
+
+        # Move up for next line
+        current_y -= line_height
+
+    return frame
+
+
+class CaptionSprite:
+    """Caption rendered once into a BGRA sprite and alpha-blended per frame
+
+    The caption is only drawn with cv2.putText when its text changes. Every
+    other frame just blends the sprite into the small region it covers. With
+    mirror enabled the sprite itself is flipped and placed at the mirrored
+    position, which looks the same as flipping the frame, drawing the caption
+    and flipping it back, without touching the rest of the frame.
+    """
+
+    def __init__(self, font, scale, color, thickness, outline_color, outline_thickness,
+                 max_width_ratio=MAX_TEXT_WIDTH_RATIO, mirror=False, layouts=None):
+        self.font = font
+        self.scale = scale
+        self.color = color
+        self.thickness = thickness
+        self.outline_color = outline_color
+        self.outline_thickness = outline_thickness
+        self.max_width_ratio = max_width_ratio
+        self.mirror = mirror
+        self.layouts = layouts or caption_layouts
+
+        self._key = None
+        self._sprite = None  # (bgra, x, y, premultiplied bgr, 255 - alpha)
+        self.renders = 0
+
+    def render(self, text, frame_width, frame_height, y_position):
+        """Render text into a BGRA sprite, returns (bgra, x, y) or None if nothing to draw"""
+        key = (text, frame_width, frame_height, y_position)
+        if key == self._key:
+            return self._sprite[:3] if self._sprite else None
+        self._key = key
+        self._sprite = None
+        if not text:
+            return None
+
+        max_text_width = int(frame_width * self.max_width_ratio)
+        lines, widths, line_height = self.layouts.layout(text, self.font, self.scale, self.thickness, max_text_width)
+        if not lines:
+            return None
+        (_, text_height), baseline = cv2.getTextSize("Ay", self.font, self.scale, self.thickness)
+
+        # Bounding box of all lines, padded for the outline and anti-aliasing
+        pad = self.outline_thickness + 2
+        left = min((frame_width - w) // 2 for w in widths) - pad
+        right = max((frame_width - w) // 2 + w for w in widths) + pad
+        top = y_position - (len(lines) - 1) * line_height - text_height - pad
+        bottom = y_position + baseline + pad
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, frame_width), min(bottom, frame_height)
+        if right <= left or bottom <= top:
+            return None
+
+        # Outline colour everywhere, text on top, alpha from the outline coverage
+        bgr = np.empty((bottom - top, right - left, 3), dtype=np.uint8)
+        bgr[:] = self.outline_color
+        alpha = np.zeros((bottom - top, right - left), dtype=np.uint8)
+        current_y = y_position - top
+        for line, text_width in zip(reversed(lines), reversed(widths)):
+            position = ((frame_width - text_width) // 2 - left, current_y)
+            cv2.putText(alpha, line, position, self.font, self.scale, 255, self.outline_thickness, cv2.LINE_AA)
+            cv2.putText(alpha, line, position, self.font, self.scale, 255, self.thickness, cv2.LINE_AA)
+            cv2.putText(bgr, line, position, self.font, self.scale, self.color, self.thickness, cv2.LINE_AA)
+            current_y -= line_height
+
+        bgra = np.dstack([bgr, alpha])
+        x = left
+        if self.mirror:
+            bgra = cv2.flip(bgra, 1)
+            x = frame_width - right
+
+        # Precompute both blend terms so each frame is one multiply and one add
+        alpha3 = cv2.cvtColor(np.ascontiguousarray(bgra[:, :, 3]), cv2.COLOR_GRAY2BGR)
+        premultiplied = cv2.multiply(np.ascontiguousarray(bgra[:, :, :3]), alpha3, scale=1 / 255)
+        inverse_alpha = cv2.subtract(np.full_like(alpha3, 255), alpha3)
+        self._sprite = (bgra, x, top, premultiplied, inverse_alpha)
+        self.renders += 1
+        return self._sprite[:3]
+
+    def draw(self, frame, text, y_position):
+        """Blend the caption into frame in place, only touching its bounding box"""
+        frame_height, frame_width = frame.shape[:2]
+        if self.render(text, frame_width, frame_height, y_position) is None:
+            return frame
+        bgra, x, y, premultiplied, inverse_alpha = self._sprite
+        h, w = bgra.shape[:2]
+        roi = frame[y:y + h, x:x + w]
+        cv2.multiply(roi, inverse_alpha, dst=roi, scale=1 / 255)
+        cv2.add(roi, premultiplied, dst=roi)
+        return frame
+
+
+class CaptionBar:
+    """Translucent bar along the bottom of the frame with lines of text on it
+
+    Only the bar region is touched, in place, so the rest of the frame is
+    never copied or blended. The text is drawn into a mask of the bar when it
+    changes. Every frame is then one multiply (darken the bar, cut out the
+    text) and one add (the text colour). With mirror enabled only the mask is
+    flipped, which gives the same result as flipping the frame, drawing the
+    text and flipping it back.
+    """
+
+    def __init__(self, height=110, alpha=0.5, font=cv2.FONT_HERSHEY_SIMPLEX, color=(255, 255, 255),
+                 thickness=2, mirror=False):
+        self.height = height
+        self.alpha = alpha  # 0.0 = fully transparent, 1.0 = fully opaque
+        self.font = font
+        self.color = color
+        self.thickness = thickness
+        self.mirror = mirror
+
+        self._key = None
+        self._layers = None  # (premultiplied text colour, 255 - text coverage)
+        self.renders = 0
+
+    def render(self, lines, frame_width):
+        """Blend layers of the bar for lines of (text, x, baseline from the bottom, scale)"""
+        key = (tuple(lines), frame_width)
+        if key == self._key:
+            return self._layers
+        self._key = key
+
+        mask = np.zeros((self.height, frame_width), dtype=np.uint8)
+        for text, x, from_bottom, scale in lines:
+            cv2.putText(mask, text, (x, self.height - from_bottom), self.font, scale, 255, self.thickness)
+        if self.mirror:
+            mask = cv2.flip(mask, 1)
+
+        coverage = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
+        color = np.empty_like(coverage)
+        color[:] = self.color
+        premultiplied = cv2.multiply(color, coverage, scale=1 / 255)
+        inverse_coverage = cv2.subtract(np.full_like(coverage, 255), coverage)
+        self._layers = (premultiplied, inverse_coverage)
+        self.renders += 1
+        return self._layers
+
+    def draw(self, frame, lines):
+        """Darken the bottom of frame and draw the text lines, in place"""
+        frame_height, frame_width = frame.shape[:2]
+        premultiplied, inverse_coverage = self.render(lines, frame_width)
+        roi = frame[frame_height - self.height:]
+        cv2.multiply(roi, inverse_coverage, dst=roi, scale=(1 - self.alpha) / 255)
+        cv2.add(roi, premultiplied, dst=roi)
+        return frame
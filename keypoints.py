@@ -0,0 +1,180 @@
+import numpy as np
+
+SEQUENCE_LENGTH = 30
+FEATURE_DIM = 258
+
+# Feature layout: pose (33 x 4) then left hand and right hand (21 x 3 each)
+POSE_LANDMARKS = 33
+HAND_LANDMARKS = 21
+POSE_SIZE = POSE_LANDMARKS * 4
+HAND_SIZE = HAND_LANDMARKS * 3
+
+# Serialized NormalizedLandmark: a length-delimited record per landmark holding
+# fixed32 fields x, y, z, visibility, presence (tags 0x0d, 0x15, ...) in order
+_LANDMARK_LIST_TAG = 0x0a  # repeated NormalizedLandmark landmark = 1
+_LANDMARK_FIELD_TAGS = (0x0d, 0x15, 0x1d, 0x25, 0x2d)
+_landmark_indexes = {}
+
+
+def _landmark_index(count, num_fields, columns):
+    """Byte indexes to validate and gather count serialized landmarks
+
+    Returns (tag_index, expected_tags, float_index): the positions of every
+    tag/size byte with their expected values, and the positions of the bytes
+    of the first `columns` float fields of every landmark, in output order.
+    """
+    key = (count, num_fields, columns)
+    index = _landmark_indexes.get(key)
+    if index is None:
+        record_size = 2 + 5 * num_fields
+        starts = np.arange(count)[:, None] * record_size
+        tag_offsets = np.array([0, 1] + [2 + 5 * f for f in range(num_fields)])
+        tag_index = (starts + tag_offsets).ravel()
+        expected_tags = np.tile(np.array([_LANDMARK_LIST_TAG, 5 * num_fields] +
+                                         list(_LANDMARK_FIELD_TAGS[:num_fields]), dtype=np.uint8), count)
+        float_offsets = (3 + 5 * np.arange(columns))[:, None] + np.arange(4)
+        float_index = (starts[:, :, None] + float_offsets).ravel()
+        index = _landmark_indexes[key] = (tag_index, expected_tags, float_index)
+    return index
+
+class KeypointWindow:
+    """Preallocated float32 sliding window over the last `length` keypoint frames
+
+    Every frame is written twice, at slot i and slot i + length, so the newest
+    `length` frames are always one contiguous run of the buffer. window()
+    therefore returns a (1, length, dim) view that can go straight into the
+    model, with no list slicing, np.array() or copy per frame. The view is
+    overwritten by later frames, so copy it if it has to outlive the next
+    append().
+    """
+
+    def __init__(self, length=SEQUENCE_LENGTH, dim=FEATURE_DIM):
+        self.length = length
+        self.dim = dim
+        self._buffer = np.zeros((2 * length, dim), dtype=np.float32)
+        self._head = 0  # slot the next frame goes into
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def full(self):
+        return self._count == self.length
+
+    def clear(self):
+        """Forget all frames (the memory is reused, not zeroed)"""
+        self._head = 0
+        self._count = 0
+
+    def slot(self):
+        """Row view the next frame should be written into, then call commit()"""
+        return self._buffer[self._head]
+
+    def commit(self):
+        """Publish the frame written into slot()"""
+        self._buffer[self._head + self.length] = self._buffer[self._head]
+        self._head = (self._head + 1) % self.length
+        self._count = min(self._count + 1, self.length)
+
+    def append(self, keypoints):
+        """Copy one frame of keypoints into the window"""
+        self._buffer[self._head] = keypoints
+        self.commit()
+
+    def window(self):
+        """(1, len(self), dim) view of the frames, oldest first"""
+        # Until the window first fills up, frames sit in slots 0..count-1
+        start = self._head if self.full else 0
+        return self._buffer[start:start + self._count][None, ...]
+
+
+class PresenceHistory:
+    """Fixed-size history of booleans with a running count of True values"""
+
+    def __init__(self, length=SEQUENCE_LENGTH):
+        self.length = length
+        self._values = bytearray(length)
+        self._head = 0
+        self._count = 0
+        self._true = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        """Add a value, dropping the oldest once the history is full"""
+        value = 1 if value else 0
+        if self._count == self.length:
+            self._true -= self._values[self._head]
+        else:
+            self._count += 1
+        self._values[self._head] = value
+        self._true += value
+        self._head = (self._head + 1) % self.length
+
+    def ratio(self):
+        """Fraction of the stored values that are True"""
+        return self._true / self._count if self._count else 0.0
+
+
+def extract_keypoints(results):
+    """Reference (list based) keypoint extraction, kept for benchmarks and comparisons"""
+    pose = np.array([[r.x, r.y, r.z, r.visibility]
+                     for r in results.pose_landmarks.landmark]).flatten() if results.pose_landmarks else np.zeros(33*4)
+    lh   = np.array([[r.x, r.y, r.z]
+                     for r in results.left_hand_landmarks.landmark]).flatten() if results.left_hand_landmarks else np.zeros(21*3)
+    rh   = np.array([[r.x, r.y, r.z]
+                     for r in results.right_hand_landmarks.landmark]).flatten() if results.right_hand_landmarks else np.zeros(21*3)
+    return np.concatenate([pose, lh, rh]).astype(np.float32)
+
+
+def _write_landmarks(landmark_list, out, count, columns):
+    """Write x, y, z (and visibility if columns == 4) of count landmarks into out
+
+    The landmark list is serialized once and the little-endian float32 fields
+    are gathered straight out of the protobuf bytes, so no Python object is
+    created per landmark. If the bytes don't have the expected fixed layout
+    (e.g. a field was never set) it falls back to iterating the landmarks.
+    Returns False if the landmark count is wrong.
+    """
+    data = np.frombuffer(landmark_list.SerializeToString(), dtype=np.uint8)
+    record_size = int(data[1]) if data.size > 1 else 0
+    num_fields = record_size // 5
+    if record_size % 5 == 0 and columns <= num_fields <= len(_LANDMARK_FIELD_TAGS):
+        if data.size == count * (2 + record_size):
+            tag_index, expected_tags, float_index = _landmark_index(count, num_fields, columns)
+            if np.array_equal(data[tag_index], expected_tags):
+                out[:] = data[float_index].view('<f4')
+                return True
+
+    landmarks = landmark_list.landmark
+    if len(landmarks) != count:
+        return False
+    if columns == 4:
+        values = (v for r in landmarks for v in (r.x, r.y, r.z, r.visibility))
+    else:
+        values = (v for r in landmarks for v in (r.x, r.y, r.z))
+    out[:] = np.fromiter(values, dtype=np.float32, count=count * columns)
+    return True
+
+
+def extract_keypoints_into(results, out):
+    """Write the 258-dim feature vector for results straight into out (float32)
+
+    out is usually KeypointWindow.slot(). Missing pose or hands are zeros, like
+    extract_keypoints(). Returns False if a landmark list had an unexpected
+    size, in which case out is zeroed.
+    """
+    parts = (
+        (results.pose_landmarks, out[:POSE_SIZE], POSE_LANDMARKS, 4),
+        (results.left_hand_landmarks, out[POSE_SIZE:POSE_SIZE + HAND_SIZE], HAND_LANDMARKS, 3),
+        (results.right_hand_landmarks, out[POSE_SIZE + HAND_SIZE:], HAND_LANDMARKS, 3),
+    )
+    for landmark_list, target, count, columns in parts:
+        if landmark_list is None:
+            target[:] = 0.0
+        elif not _write_landmarks(landmark_list, target, count, columns):
+            out[:] = 0.0
+            return False
+    return True
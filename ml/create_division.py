@@ -1,6 +1,7 @@
-import json
 import os
 
+from wlasl_index import gloss_count, open_index, select_subset, write_subset
+
 meeting_words = [
     "hello",
     "thank you",
@@ -17,22 +18,13 @@ meeting_words = [
 # Get the directory where this script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
-# Load the WLASL dataset
+# Open the WLASL index (built from WLASL_v0.3.json on first use)
 wlasl_path = os.path.join(script_dir, "WLASL_v0.3.json")
-with open(wlasl_path, "r") as f:
-    wlasl_data = json.load(f)
-
-# Filter objects where gloss matches meeting words
-filtered_data = []
-for obj in wlasl_data:
-    gloss = obj.get("gloss", "")
-    if gloss in meeting_words:
-        filtered_data.append(obj)
+conn = open_index(wlasl_path)
 
-# Write filtered data to wlasl_subset.json
+# Write the meeting words to wlasl_subset.json
 output_path = os.path.join(script_dir, "wlasl_subset.json")
-with open(output_path, "w") as f:
-    json.dump(filtered_data, f, indent=4)
-
-print(f"Filtered {len(filtered_data)} objects from {len(wlasl_data)} total objects")
+count = write_subset(output_path, select_subset(conn, meeting_words))
 
+print(f"Filtered {count} objects from {gloss_count(conn)} total objects")
+conn.close()
@@ -0,0 +1,98 @@
+# ============================================================
+# Export the sign classifier to TFLite + parity check
+# - Converts wlasl_demo.keras to wlasl_demo.tflite (batch size 1)
+# - Optional quantization:
+#     float16 - float16 weights
+#     int8    - int8 weights, float activations (dynamic range).
+#               Full integer calibration doesn't support the GRU layers.
+# - Compares top-1 agreement and latency against the Keras model
+#   on recorded keypoint sequences (.npy of shape (N, 30, 258))
+#
+#   python ml/export_tflite.py --quantize float16 --data keypoints.npy
+# ============================================================
+
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+from keypoints import FEATURE_DIM, SEQUENCE_LENGTH
+from sign_model import KerasClassifier, TFLiteClassifier
+
+
+def export_tflite(model_path, output_path, quantize="none"):
+    """Convert the Keras model to a fixed (1, 30, 258) TFLite model"""
+    model = tf.keras.models.load_model(model_path)
+
+    # A fixed batch size keeps every shape static, which the GRU lowering needs
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        model.export(
+            saved_model_dir,
+            input_signature=[tf.TensorSpec((1, SEQUENCE_LENGTH, FEATURE_DIM), tf.float32)],
+            verbose=False
+        )
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        if quantize == "float16":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+        elif quantize == "int8":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        tflite_model = converter.convert()
+
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+    print(f"Wrote {output_path} ({len(tflite_model) / 1024:.0f} KB, quantize={quantize})")
+
+
+def check_parity(keras_classifier, tflite_classifier, sequences):
+    """Top-1 agreement, probability error and latency of TFLite vs Keras"""
+    agree = 0
+    max_diff = 0.0
+    for x in sequences:
+        x = np.ascontiguousarray(x, dtype=np.float32)[None, ...]
+        expected = keras_classifier.predict(x)
+        probs = tflite_classifier.predict(x)
+        agree += int(np.argmax(expected) == np.argmax(probs))
+        max_diff = max(max_diff, float(np.abs(expected - probs).max()))
+
+    print(f"\nParity on {len(sequences)} sequences:")
+    print(f"  top-1 agreement: {agree / len(sequences) * 100:.1f}%")
+    print(f"  max probability difference: {max_diff:.4f}")
+    print(f"  keras  {keras_classifier.latency}")
+    print(f"  tflite {tflite_classifier.latency}")
+    return agree / len(sequences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the sign classifier to TFLite")
+    parser.add_argument("--model", default=os.path.join(root_dir, "wlasl_demo.keras"))
+    parser.add_argument("--output", default=os.path.join(root_dir, "wlasl_demo.tflite"))
+    parser.add_argument("--quantize", choices=["none", "float16", "int8"], default="none")
+    parser.add_argument("--data", help="Recorded keypoint sequences (.npy, shape (N, 30, 258)) for the parity check")
+    parser.add_argument("--samples", type=int, default=200, help="Number of sequences to compare (default: 200)")
+    parser.add_argument("--no-check", action="store_true", help="Skip the parity check")
+    args = parser.parse_args()
+
+    export_tflite(args.model, args.output, args.quantize)
+    if args.no_check:
+        return
+
+    if args.data:
+        sequences = np.load(args.data, mmap_mode="r")[:args.samples]
+    else:
+        print("\nWarning: no --data given, checking parity on random sequences "
+              "(agreement on real keypoints is usually higher)")
+        rng = np.random.default_rng(0)
+        sequences = rng.random((args.samples, SEQUENCE_LENGTH, FEATURE_DIM), dtype=np.float32)
+
+    check_parity(KerasClassifier(args.model), TFLiteClassifier(args.output), sequences)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# ============================================================
+# Batch keypoint extraction for WLASL clips
+# - Runs Holistic over the local videos of every instance in
+#   wlasl_subset.json on a process pool, only over the
+#   frame_start..frame_end range and cropped to the bbox
+# - Same sampling as the training notebook: SEQUENCE_LENGTH frames
+#   spread uniformly over the range (widened if it is too short)
+# - Writes a keypoint store (one row per instance):
+#     sequences.npy  float32 (N, 30, 258), memory-mapped
+#     index.jsonl    one record per processed instance
+# - Resumable: instances already in index.jsonl are skipped
+#   (failed ones too, unless --retry-failed)
+# - Reports frames per second of every worker
+#
+#   python ml/extract_keypoints.py --videos /data/wlasl/videos --workers 8
+# ============================================================
+
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+import multiprocessing
+
+import cv2
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+from keypoints import FEATURE_DIM, SEQUENCE_LENGTH, extract_keypoints_into
+from trackers import HOLISTIC, TRACKERS, create_tracker, prepare_frame
+
+STORE_SEQUENCES = "sequences.npy"
+STORE_INDEX = "index.jsonl"
+OK = "ok"
+
+
+def load_instances(subset_path):
+    """[(gloss, instance)] in file order, the row of an instance is its position"""
+    with open(subset_path, "r") as f:
+        data = json.load(f)
+    return [(entry["gloss"], inst) for entry in data for inst in entry.get("instances", [])
+            if inst.get("video_id") is not None]
+
+
+def read_index(output_dir):
+    """{row: newest record} of the instances processed so far"""
+    records = {}
+    path = os.path.join(output_dir, STORE_INDEX)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    records[record["row"]] = record
+    return records
+
+
+def open_store(output_dir, count):
+    """Create (or check and reopen) the (count, 30, 258) sequences file"""
+    path = os.path.join(output_dir, STORE_SEQUENCES)
+    shape = (count, SEQUENCE_LENGTH, FEATURE_DIM)
+    if os.path.exists(path):
+        sequences = np.load(path, mmap_mode="r")
+        if sequences.shape != shape:
+            raise SystemExit(f"Error: {path} has shape {sequences.shape}, expected {shape}. "
+                             "It was created for a different subset, use another --output.")
+        return
+    os.makedirs(output_dir, exist_ok=True)
+    np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=shape).flush()
+
+
+def clamp_bbox(bbox, w, h):
+    x1, y1, x2, y2 = bbox
+    x1 = int(max(0, min(w - 1, x1)))
+    x2 = int(max(0, min(w - 1, x2)))
+    y1 = int(max(0, min(h - 1, y1)))
+    y2 = int(max(0, min(h - 1, y2)))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+def frame_range(inst, total_frames, length=SEQUENCE_LENGTH):
+    """(first, last) frame to sample from, widened to `length` frames, or None if the video is too short"""
+    fs = inst.get("frame_start", 0)
+    fe = inst.get("frame_end", -1)
+    if fe == -1 or fe is None:
+        fe = total_frames - 1
+    fs = max(0, min(total_frames - 1, int(fs)))
+    fe = max(0, min(total_frames - 1, int(fe)))
+
+    if fe - fs + 1 < length:
+        needed = length - (fe - fs + 1)
+        expand_left = min(needed // 2, fs)
+        expand_right = min(needed - expand_left, total_frames - 1 - fe)
+        fs = max(0, fs - expand_left)
+        fe = min(total_frames - 1, fe + expand_right)
+
+    if fe < fs or (fe - fs + 1) < length:
+        return None
+    return fs, fe
+
+
+def sample_indices(start, end, n=SEQUENCE_LENGTH):
+    """n frame numbers spread uniformly over start..end (inclusive)"""
+    return (start + np.linspace(0, end - start, n).astype(int)).tolist()
+
+
+# --------------- WORKER PROCESSES ---------------
+_worker = {}
+
+def _init_worker(output_dir, videos_dir, tracker_name):
+    _worker["sequences"] = np.load(os.path.join(output_dir, STORE_SEQUENCES), mmap_mode="r+")
+    _worker["videos_dir"] = videos_dir
+    _worker["tracker_name"] = tracker_name
+
+def _extract(task):
+    """Extract one instance into its row of the store, returns its index record"""
+    row, gloss, inst = task
+    start = time.perf_counter()
+    status, saved, decoded = _extract_into(inst, _worker["sequences"][row])
+    if status != OK:
+        _worker["sequences"][row] = 0.0
+    _worker["sequences"].flush()
+    return {
+        "row": row,
+        "video_id": str(inst["video_id"]),
+        "gloss": gloss,
+        "signer_id": inst.get("signer_id"),
+        "split": inst.get("split"),
+        "source": inst.get("source"),
+        "status": status,
+        "frames": saved,
+        "decoded": decoded,
+        "seconds": round(time.perf_counter() - start, 3),
+        "worker": os.getpid(),
+    }
+
+def _extract_into(inst, out):
+    """Returns (status, frames processed, frames decoded)"""
+    video_path = os.path.join(_worker["videos_dir"], f"{inst['video_id']}.mp4")
+    if not os.path.exists(video_path):
+        return "video_not_found", 0, 0
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return "cannot_open", 0, 0
+
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0:
+            return "zero_frames", 0, 0
+        frames = frame_range(inst, total_frames)
+        if frames is None:
+            return "insufficient_frames", 0, 0
+
+        bbox = inst.get("bbox")
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frames[0])
+        position = frames[0]
+        saved = decoded = 0
+        # A fresh tracker per clip, video-mode tracking must not carry over from the previous clip
+        with create_tracker(_worker["tracker_name"]) as tracker:
+            for target in sample_indices(*frames):
+                # grab() skips the frames in between without converting them
+                while position < target and cap.grab():
+                    position += 1
+                    decoded += 1
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    break
+                position += 1
+                decoded += 1
+
+                if bbox is not None and len(bbox) == 4:
+                    h, w = frame.shape[:2]
+                    bb = clamp_bbox(bbox, w, h)
+                    if bb is not None:
+                        x1, y1, x2, y2 = bb
+                        frame = frame[y1:y2, x1:x2]
+                results = tracker.process(prepare_frame(frame))
+                extract_keypoints_into(results, out[saved])
+                saved += 1
+    finally:
+        cap.release()
+
+    if saved != SEQUENCE_LENGTH:
+        return f"incomplete_{saved}/{SEQUENCE_LENGTH}", saved, decoded
+    return OK, saved, decoded
+
+
+def print_worker_stats(per_worker):
+    print("\nPer worker:")
+    print(f"  {'worker':>8} {'clips':>6} {'frames':>8} {'fps':>7} {'decode fps':>11}")
+    for pid, s in sorted(per_worker.items()):
+        busy = max(s["seconds"], 1e-6)
+        print(f"  {pid:>8} {s['clips']:>6} {s['frames']:>8} {s['frames'] / busy:>7.1f} {s['decoded'] / busy:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract (30, 258) keypoint sequences for WLASL instances")
+    parser.add_argument("--subset", default=os.path.join(script_dir, "wlasl_subset.json"))
+    parser.add_argument("--videos", required=True, help="Directory with the WLASL clips (<video_id>.mp4)")
+    parser.add_argument("--output", default=os.path.join(script_dir, "keypoints"), help="Keypoint store directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tracker", choices=TRACKERS, default=HOLISTIC,
+                        help="Landmark tracker, keep holistic to match the trained model (default: holistic)")
+    parser.add_argument("--retry-failed", action="store_true", help="Process instances that failed before again")
+    args = parser.parse_args()
+
+    instances = load_instances(args.subset)
+    open_store(args.output, len(instances))
+    done = read_index(args.output)
+    tasks = [(row, gloss, inst) for row, (gloss, inst) in enumerate(instances)
+             if row not in done or (args.retry_failed and done[row]["status"] != OK)]
+    print(f"{len(instances)} instances, {len(instances) - len(tasks)} already processed, {len(tasks)} to go")
+    if not tasks:
+        return
+
+    statuses = collections.Counter()
+    per_worker = collections.defaultdict(lambda: {"clips": 0, "frames": 0, "decoded": 0, "seconds": 0.0})
+    started = time.perf_counter()
+    index_path = os.path.join(args.output, STORE_INDEX)
+    with multiprocessing.Pool(args.workers, initializer=_init_worker,
+                              initargs=(args.output, args.videos, args.tracker)) as pool, \
+            open(index_path, "a") as index:
+        for i, record in enumerate(pool.imap_unordered(_extract, tasks), 1):
+            # The row is flushed by the worker before its record is written, so a
+            # crash at worst repeats the instances that were in flight
+            index.write(json.dumps(record) + "\n")
+            index.flush()
+
+            statuses[record["status"]] += 1
+            s = per_worker[record["worker"]]
+            s["clips"] += 1
+            s["frames"] += record["frames"]
+            s["decoded"] += record["decoded"]
+            s["seconds"] += record["seconds"]
+            if i % 50 == 0 or i == len(tasks):
+                elapsed = time.perf_counter() - started
+                frames = sum(w["frames"] for w in per_worker.values())
+                print(f"  {i}/{len(tasks)} instances, {statuses[OK]} ok, "
+                      f"{frames / elapsed:.1f} frames/s overall")
+
+    print(f"\nDone in {time.perf_counter() - started:.1f} s")
+    for status, count in statuses.most_common():
+        print(f"  {status}: {count}")
+    print_worker_stats(per_worker)
+    print(f"\nKeypoint store: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# ============================================================
+# Memory-mapped keypoint dataset
+# - pack: copies the ok rows of an extract_keypoints.py store into
+#   one contiguous float32 (N, 30, 258) .npy, ordered by split, with
+#   a sidecar <name>.index.json (gloss, label, signer_id, split,
+#   video_id per row, the label list and the row range of each split)
+# - KeypointDataset opens it memory-mapped: every split is a slice,
+#   so train/val/test arrays are views without copies, and
+#   tf_dataset() streams batches into tf.data without loading the
+#   file into RAM
+#
+#   python ml/keypoint_dataset.py pack --store ml/keypoints --output ml/wlasl_keypoints
+#   python ml/keypoint_dataset.py info ml/wlasl_keypoints
+#
+#   data = KeypointDataset("ml/wlasl_keypoints")
+#   X_train, y_train = data.split("train")
+#   model.fit(data.tf_dataset("train"), validation_data=data.tf_dataset("val", shuffle=False))
+# ============================================================
+
+import argparse
+import collections
+import json
+import os
+import sys
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+from keypoints import FEATURE_DIM, SEQUENCE_LENGTH
+
+SPLITS = ("train", "val", "test")
+INDEX_SUFFIX = ".index.json"
+
+
+def dataset_paths(path):
+    """(sequences .npy, sidecar index) of a dataset, with or without the .npy extension"""
+    if path.endswith(".npy"):
+        path = path[:-len(".npy")]
+    return path + ".npy", path + INDEX_SUFFIX
+
+
+def pack(store_dir, output, actions=None):
+    """Copy the ok rows of an extractor store into a contiguous dataset, returns its row count
+
+    Rows are ordered by split (train, val, test, anything else after) and then by
+    gloss, so every split is one contiguous range. Labels index into `actions`
+    (sorted glosses like the notebook, unless a label list is given, e.g. the
+    actions.json of a trained model).
+    """
+    # Imported here so loading a packed dataset doesn't need the extractor, packing
+    # does import it and with it cv2 and mediapipe (through trackers.py)
+    from extract_keypoints import OK, STORE_SEQUENCES, read_index
+
+    records = [r for r in read_index(store_dir).values() if r["status"] == OK]
+    if actions is None:
+        actions = sorted({r["gloss"] for r in records})
+    label_of = {gloss: i for i, gloss in enumerate(actions)}
+    skipped = sum(1 for r in records if r["gloss"] not in label_of)
+    records = [r for r in records if r["gloss"] in label_of]
+    for r in records:
+        r["split"] = r.get("split") or "unknown"
+    if not records:
+        raise SystemExit(f"Error: no extracted sequences in {store_dir}")
+
+    split_order = {split: i for i, split in enumerate(SPLITS)}
+    records.sort(key=lambda r: (split_order.get(r["split"], len(SPLITS)), r["split"],
+                                label_of[r["gloss"]], r["row"]))
+
+    source = np.load(os.path.join(store_dir, STORE_SEQUENCES), mmap_mode="r")
+    sequences_path, index_path = dataset_paths(output)
+    os.makedirs(os.path.dirname(os.path.abspath(sequences_path)), exist_ok=True)
+    sequences = np.lib.format.open_memmap(sequences_path, mode="w+", dtype=np.float32,
+                                          shape=(len(records), SEQUENCE_LENGTH, FEATURE_DIM))
+    # Store rows are in subset order, so mostly sequential reads
+    rows = np.array([r["row"] for r in records])
+    for out, row in enumerate(rows):
+        sequences[out] = source[row]
+    sequences.flush()
+    del sequences
+
+    splits = {}
+    for i, r in enumerate(records):
+        start, _ = splits.get(r["split"], (i, i))
+        splits[r["split"]] = (start, i + 1)
+
+    index = {
+        "actions": list(actions),
+        "splits": splits,
+        "gloss": [r["gloss"] for r in records],
+        "label": [label_of[r["gloss"]] for r in records],
+        "signer_id": [r.get("signer_id") for r in records],
+        "split": [r["split"] for r in records],
+        "video_id": [r["video_id"] for r in records],
+    }
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+
+    if skipped:
+        print(f"Warning: {skipped} sequences have a gloss that is not in the label list and were left out")
+    return len(records)
+
+
+class KeypointDataset:
+    """A packed keypoint dataset, memory-mapped
+
+    sequences is the read-only (N, 30, 258) memmap, labels/signer_ids/video_ids
+    and glosses are per-row arrays from the sidecar index. split() returns views
+    into the memmap, so only the pages that are actually read are loaded.
+    """
+
+    def __init__(self, path):
+        sequences_path, index_path = dataset_paths(path)
+        self.sequences = np.load(sequences_path, mmap_mode="r")
+        with open(index_path, "r") as f:
+            index = json.load(f)
+
+        self.actions = index["actions"]
+        self.splits = {name: tuple(bounds) for name, bounds in index["splits"].items()}
+        self.labels = np.array(index["label"], dtype=np.int32)
+        self.glosses = np.array(index["gloss"])
+        self.signer_ids = np.array([-1 if s is None else s for s in index["signer_id"]])
+        self.split_names = np.array(index["split"])
+        self.video_ids = np.array(index["video_id"])
+
+        if len(self.labels) != len(self.sequences):
+            raise ValueError(f"{index_path} has {len(self.labels)} rows, "
+                             f"{sequences_path} has {len(self.sequences)}")
+
+    def __len__(self):
+        return len(self.sequences)
+
+    def split_range(self, name):
+        """(start, stop) rows of a split"""
+        if name not in self.splits:
+            raise KeyError(f"No '{name}' split, the dataset has {sorted(self.splits)}")
+        return self.splits[name]
+
+    def split(self, name):
+        """(sequences, labels) of a split, both views without a copy"""
+        start, stop = self.split_range(name)
+        return self.sequences[start:stop], self.labels[start:stop]
+
+    def rows(self, split=None, glosses=None, signers=None):
+        """Row numbers matching all given filters, e.g. for signer-independent evaluation"""
+        mask = np.ones(len(self), dtype=bool)
+        if split is not None:
+            start, stop = self.split_range(split)
+            mask[:start] = False
+            mask[stop:] = False
+        if glosses is not None:
+            mask &= np.isin(self.glosses, list(glosses))
+        if signers is not None:
+            mask &= np.isin(self.signer_ids, list(signers))
+        return np.flatnonzero(mask)
+
+    def tf_dataset(self, split=None, rows=None, batch_size=32, shuffle=True, seed=None):
+        """tf.data pipeline of (sequences, labels) batches read from the memmap
+
+        Takes a split name or explicit row numbers (default: all rows). Only the
+        row numbers are shuffled, each batch is gathered from the memmap in row
+        order (so reads stay mostly sequential) and prefetched.
+        """
+        import tensorflow as tf
+
+        if rows is None:
+            if split is None:
+                rows = np.arange(len(self))
+            else:
+                rows = np.arange(*self.split_range(split))
+        rows = np.asarray(rows, dtype=np.int64)
+        sequences, labels = self.sequences, self.labels
+
+        def gather(batch_rows):
+            batch_rows = np.sort(batch_rows)
+            return sequences[batch_rows], labels[batch_rows]
+
+        def load(batch_rows):
+            x, y = tf.numpy_function(gather, [batch_rows], (tf.float32, tf.int32))
+            x.set_shape((None, SEQUENCE_LENGTH, FEATURE_DIM))
+            y.set_shape((None,))
+            return x, y
+
+        dataset = tf.data.Dataset.from_tensor_slices(rows)
+        if shuffle:
+            dataset = dataset.shuffle(len(rows), seed=seed, reshuffle_each_iteration=True)
+        return (dataset.batch(batch_size)
+                .map(load, num_parallel_calls=tf.data.AUTOTUNE)
+                .prefetch(tf.data.AUTOTUNE))
+
+    def print_info(self):
+        """Print row counts per split, glosses and signers"""
+        print(f"{len(self)} sequences, {len(self.actions)} glosses, "
+              f"{len(np.unique(self.signer_ids))} signers, {self.sequences.nbytes / 1e6:.1f} MB")
+        for name, (start, stop) in self.splits.items():
+            counts = collections.Counter(self.glosses[start:stop].tolist())
+            print(f"  {name}: {stop - start} sequences (rows {start}-{stop - 1}), "
+                  f"{min(counts.values())}-{max(counts.values())} per gloss")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack and inspect memory-mapped keypoint datasets")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = commands.add_parser("pack", help="Pack an extract_keypoints.py store into a dataset")
+    pack_parser.add_argument("--store", default=os.path.join(script_dir, "keypoints"))
+    pack_parser.add_argument("--output", default=os.path.join(script_dir, "wlasl_keypoints"))
+    pack_parser.add_argument("--actions", help="actions.json to take the label order from (default: sorted glosses)")
+
+    info_parser = commands.add_parser("info", help="Print a summary of a dataset")
+    info_parser.add_argument("dataset")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        actions = None
+        if args.actions:
+            with open(args.actions, "r") as f:
+                actions = json.load(f)
+        count = pack(args.store, args.output, actions)
+        print(f"[OK] Packed {count} sequences into {dataset_paths(args.output)[0]}")
+        KeypointDataset(args.output).print_info()
+    else:
+        KeypointDataset(args.dataset).print_info()
+
+
+if __name__ == "__main__":
+    main()
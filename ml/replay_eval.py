@@ -0,0 +1,407 @@
+# ============================================================
+# Offline evaluation of the asl.py commit logic
+# - record: runs the landmark tracker over a video file and saves
+#   per-frame keypoints + timestamps (asl.py --record saves the
+#   same format from the webcam)
+# - eval: replays recordings through the sign classifier and the
+#   PredictionSmoother faster than real time and deterministically,
+#   and scores the committed words against a reference:
+#     WER, false commits and sign-to-commit latency
+#   Give several values for a parameter to sweep the grid on all cores.
+#
+# The reference of rec.npz is read from rec.json, either a list of
+# words or of {"word", "start", "end"} (seconds from the first frame).
+# Latency and false commits by time need the timed form, with plain
+# words false commits are the insertions + substitutions.
+#
+#   python ml/replay_eval.py record --video session.mp4 -o session.npz
+#   python ml/replay_eval.py eval session.npz
+#   python ml/replay_eval.py eval *.npz --commit-thresh 0.4,0.5,0.6 --hold-time 0.3,0.5 --workers 8
+# ============================================================
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(script_dir)
+sys.path.insert(0, root_dir)
+from keypoints import FEATURE_DIM, SEQUENCE_LENGTH, KeypointWindow, PresenceHistory
+from perf import LatencyStats
+from recording import KeypointRecorder, load_recording
+from sign_model import StrideController
+from smoothing import SMOOTHING_MODES, PredictionSmoother
+
+# Same defaults as the CONFIG section of asl.py (stride = INFERENCE_STRIDE,
+# adaptive = ADAPTIVE_STRIDE, max_stride = MAX_INFERENCE_STRIDE)
+DEFAULT_PARAMS = {
+    "smoothing": "ema",
+    "window_seconds": 0.5,
+    "min_votes": 3,
+    "idle_thresh": 0.4,
+    "commit_thresh": 0.5,
+    "hold_time": 0.5,
+    "hand_ratio": 0.5,
+    "repeat_delay": 5.0,
+    "clear_idle": 10.0,
+    "stride": 1,
+    "adaptive": True,
+    "max_stride": 5,
+}
+PARAM_TYPES = {name: type(value) for name, value in DEFAULT_PARAMS.items()}
+BOOL_VALUES = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False}
+COMMIT_TOLERANCE = 1.0  # a commit up to this long after the sign ended still counts
+
+
+# --------------- RECORD ---------------
+def record_video(video, output, tracker_name, model_complexity=None):
+    """Run a tracker over a video file and save it as a recording, timestamps from the frame rate"""
+    import cv2
+    from keypoints import extract_keypoints_into
+    from trackers import create_tracker, prepare_frame
+
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise SystemExit(f"Error: Could not open {video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    recorder = KeypointRecorder()
+    keypoints = np.zeros(FEATURE_DIM, dtype=np.float32)
+    frame_index = 0
+    with create_tracker(tracker_name, model_complexity) as tracker:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            results = tracker.process(prepare_frame(frame))
+            has_hands = results.left_hand_landmarks is not None or results.right_hand_landmarks is not None
+            if has_hands:
+                extract_keypoints_into(results, keypoints)
+            recorder.add(frame_index / fps, has_hands, keypoints if has_hands else None)
+            frame_index += 1
+    cap.release()
+    recorder.save(output)
+    return frame_index
+
+
+# --------------- REPLAY ---------------
+def classify_windows(recording, classifier):
+    """Class probabilities for every frame at which asl.py would have a full window
+
+    The window only depends on the hand flags (it is cleared whenever hands are
+    down), not on any tunable parameter, so this runs once per recording and
+    the sweep reuses it. Rows of frames without a full window are NaN.
+    """
+    hands, keypoints = recording["hands"], recording["keypoints"]
+    window = KeypointWindow(SEQUENCE_LENGTH, FEATURE_DIM)
+    probs = None
+    for i in range(len(hands)):
+        if not hands[i]:
+            window.clear()
+            continue
+        window.append(keypoints[i])
+        if window.full:
+            p = classifier.predict(window.window())
+            if probs is None:
+                probs = np.full((len(hands), len(p)), np.nan, dtype=np.float32)
+            probs[i] = p
+    return probs
+
+
+def replay(recording, probs, labels, params):
+    """Commits [(time, word)] the sign branch of the asl.py loop makes with these parameters
+
+    Classification is synchronous here, so commit times don't include the
+    inference latency of a live run. The adaptive stride only follows the
+    stable-sign rule, the replay never falls behind so it is never raised
+    because the CPU is saturated.
+    """
+    smoother = PredictionSmoother(
+        labels,
+        mode=params["smoothing"],
+        window_seconds=params["window_seconds"],
+        min_votes=params["min_votes"],
+        idle_thresh=params["idle_thresh"],
+        commit_thresh=params["commit_thresh"],
+        hold_time=params["hold_time"],
+        repeat_delay=params["repeat_delay"],
+    )
+    stride = StrideController(
+        params["stride"],
+        adaptive=params["adaptive"],
+        min_stride=params["stride"],
+        max_stride=params["max_stride"],
+        stable_conf=params["commit_thresh"]
+    )
+    hand_history = PresenceHistory(SEQUENCE_LENGTH)
+    last_hand_time = None
+    commits = []
+    if probs is None:
+        return commits
+
+    for now, has_hands, p in zip(recording["times"], recording["hands"], probs):
+        now = float(now)
+        hand_history.append(has_hands)
+        if not has_hands:
+            if last_hand_time is None:
+                last_hand_time = now
+            if now - last_hand_time >= params["clear_idle"]:
+                smoother.forget_last_commit()
+            smoother.reset()
+            stride.reset()
+            continue
+        last_hand_time = None
+
+        if np.isnan(p[0]) or hand_history.ratio() < params["hand_ratio"] or not stride.should_submit():
+            continue
+        stride.update(int(np.argmax(p)), float(np.max(p)), 0)
+        committed, _, _ = smoother.update(p, now)
+        if committed:
+            commits.append((now, committed))
+    return commits
+
+
+# --------------- SCORING ---------------
+def edit_operations(reference, hypothesis):
+    """(substitutions, deletions, insertions) of the minimum word alignment"""
+    n, m = len(reference), len(hypothesis)
+    # cost[i][j] = (edits, subs, dels, ins) aligning reference[:i] with hypothesis[:j]
+    cost = [[(j, 0, 0, j) for j in range(m + 1)]]
+    for i in range(1, n + 1):
+        row = [(i, 0, i, 0)]
+        for j in range(1, m + 1):
+            if reference[i - 1] == hypothesis[j - 1]:
+                best = cost[i - 1][j - 1]
+            else:
+                e, s, d, ins = cost[i - 1][j - 1]
+                best = (e + 1, s + 1, d, ins)
+            e, s, d, ins = cost[i - 1][j]
+            best = min(best, (e + 1, s, d + 1, ins))
+            e, s, d, ins = row[j - 1]
+            best = min(best, (e + 1, s, d, ins + 1))
+            row.append(best)
+        cost.append(row)
+    return cost[n][m][1:]
+
+
+def load_reference(recording_path):
+    """Reference signs [{word, start, end}] (start/end None if untimed), or None if there is none"""
+    path = os.path.splitext(recording_path)[0] + ".json"
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        data = json.load(f)
+    return [{"word": s, "start": None, "end": None} if isinstance(s, str) else s for s in data]
+
+
+def score(commits, reference, tolerance=COMMIT_TOLERANCE):
+    """Word errors, false commits and sign-to-commit latencies of one replay"""
+    words = [word for _, word in commits]
+    ref_words = [s["word"] for s in reference]
+    subs, dels, ins = edit_operations(ref_words, words)
+    result = {"ref_words": len(ref_words), "commits": len(words), "errors": subs + dels + ins,
+              "substitutions": subs, "deletions": dels, "insertions": ins, "latencies": []}
+
+    timed = all(s["start"] is not None for s in reference)
+    if not timed:
+        result["false_commits"] = subs + ins
+        return result
+
+    # A commit is correct if it names a sign that is still unmatched and it
+    # arrives between the sign's start and shortly after its end
+    matched = [False] * len(reference)
+    false_commits = 0
+    for t, word in commits:
+        for k, sign in enumerate(reference):
+            if not matched[k] and sign["word"] == word and sign["start"] <= t <= sign["end"] + tolerance:
+                matched[k] = True
+                result["latencies"].append(t - sign["start"])
+                break
+        else:
+            false_commits += 1
+    result["false_commits"] = false_commits
+    return result
+
+
+def evaluate(sessions, labels, params):
+    """Replay every session with params, returns summed metrics"""
+    totals = {"ref_words": 0, "commits": 0, "errors": 0, "false_commits": 0, "latencies": []}
+    for session in sessions:
+        commits = replay(session["recording"], session["probs"], labels, params)
+        if session["reference"] is None:
+            totals["commits"] += len(commits)
+            continue
+        result = score(commits, session["reference"])
+        for key in totals:
+            totals[key] += result[key]
+    return totals
+
+
+def summarize(totals):
+    """WER and latency percentiles from summed metrics"""
+    latency = LatencyStats("sign to commit", maxlen=max(1, len(totals["latencies"])))
+    for seconds in totals["latencies"]:
+        latency.add(seconds)
+    return {
+        "wer": totals["errors"] / totals["ref_words"] if totals["ref_words"] else None,
+        "false_commits": totals["false_commits"],
+        "commits": totals["commits"],
+        "ref_words": totals["ref_words"],
+        "latency_p50": latency.percentile(50) if totals["latencies"] else None,
+        "latency_p90": latency.percentile(90) if totals["latencies"] else None,
+    }
+
+
+# --------------- PARALLEL SWEEP ---------------
+_sweep = {}
+
+def _init_worker(sessions, labels):
+    _sweep["sessions"] = sessions
+    _sweep["labels"] = labels
+
+def _evaluate_params(params):
+    return params, summarize(evaluate(_sweep["sessions"], _sweep["labels"], params))
+
+
+def parse_value(name, text):
+    """One command line value of a parameter, with the type of its default"""
+    param_type = PARAM_TYPES[name]
+    text = text.strip()
+    if param_type is bool:
+        if text.lower() not in BOOL_VALUES:
+            raise SystemExit(f"Error: invalid --{name.replace('_', '-')} value '{text}', expected true or false")
+        return BOOL_VALUES[text.lower()]
+    if name == "smoothing":
+        if text not in SMOOTHING_MODES:
+            raise SystemExit(f"Error: unknown smoothing '{text}', expected one of {SMOOTHING_MODES}")
+        return text
+    try:
+        return param_type(text)
+    except ValueError:
+        raise SystemExit(f"Error: invalid --{name.replace('_', '-')} value '{text}', "
+                         f"expected {'an integer' if param_type is int else 'a number'}")
+
+
+def parse_grid(args):
+    """{param: [values]} from the comma separated command line values"""
+    grid = {}
+    for name, default in DEFAULT_PARAMS.items():
+        value = getattr(args, name)
+        if value is None:
+            grid[name] = [default]
+        else:
+            grid[name] = [parse_value(name, v) for v in value.split(",")]
+    return grid
+
+
+def format_metrics(m):
+    wer = f"{m['wer'] * 100:5.1f}%" if m["wer"] is not None else "    -"
+    p50 = f"{m['latency_p50'] * 1000:5.0f} ms" if m["latency_p50"] is not None else "      -"
+    return f"WER {wer}  false commits {m['false_commits']:>3}  commits {m['commits']:>3}  sign to commit p50 {p50}"
+
+
+def load_sessions(paths, classifier):
+    """Recordings with their references and classifier outputs"""
+    sessions = []
+    for path in paths:
+        recording = load_recording(path)
+        start = time.perf_counter()
+        probs = classify_windows(recording, classifier)
+        elapsed = time.perf_counter() - start
+        duration = float(recording["times"][-1]) if len(recording["times"]) else 0.0
+        print(f"{os.path.basename(path)}: {len(recording['times'])} frames ({duration:.1f} s) "
+              f"classified in {elapsed:.1f} s ({duration / max(elapsed, 1e-6):.0f}x real time)")
+        sessions.append({"path": path, "recording": recording, "probs": probs,
+                         "reference": load_reference(path)})
+    return sessions
+
+
+def run_eval(args):
+    from sign_model import load_classifier
+
+    # Checked before the recordings are classified so a typo fails right away
+    grid = parse_grid(args)
+    combos = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+    with open(args.actions, "r") as f:
+        labels = json.load(f)
+    classifier = load_classifier(args.model, args.tflite)
+    print(f"Classifier: {classifier.name}")
+    sessions = load_sessions(args.recordings, classifier)
+    if not any(s["reference"] is not None for s in sessions):
+        print("Warning: no reference (<recording>.json) found, only commits are counted")
+
+    if len(combos) == 1:
+        params = combos[0]
+        for session in sessions:
+            commits = replay(session["recording"], session["probs"], labels, params)
+            print(f"\n{os.path.basename(session['path'])}")
+            print("  replayed: " + " ".join(f"{word}@{t:.1f}s" for t, word in commits))
+            if len(session["recording"].get("commit_words", [])):
+                print("  live:     " + " ".join(session["recording"]["commit_words"].tolist()))
+            if session["reference"] is not None:
+                print("  expected: " + " ".join(s["word"] for s in session["reference"]))
+        results = [(params, summarize(evaluate(sessions, labels, params)))]
+    else:
+        print(f"\nSweeping {len(combos)} parameter sets on {args.workers} processes...")
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(sessions, labels)) as pool:
+            results = list(pool.imap_unordered(_evaluate_params, combos))
+        print(f"Done in {time.perf_counter() - start:.1f} s")
+        # Best first: fewest word errors, then fewest false commits, then lowest latency
+        # Runs without a WER (no reference words) or without latencies sort after the ones with
+        results.sort(key=lambda r: (r[1]["wer"] is None, r[1]["wer"] or 0.0, r[1]["false_commits"],
+                                    r[1]["latency_p50"] is None, r[1]["latency_p50"] or 0.0))
+
+    # Show the parameters that differ from asl.py for at least one run
+    changed = [name for name, values in grid.items() if values != [DEFAULT_PARAMS[name]]]
+    print()
+    for params, metrics in results[:args.top]:
+        label = ", ".join(f"{name}={params[name]}" for name in changed) or "asl.py defaults"
+        print(f"{format_metrics(metrics)}  |  {label}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([{"params": p, "metrics": m} for p, m in results], f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay keypoint streams to evaluate the asl.py commit logic")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Record keypoints of a video file")
+    record_parser.add_argument("--video", required=True)
+    record_parser.add_argument("-o", "--output", required=True, help="Recording .npz")
+    # trackers.TRACKERS, not imported here so eval runs without mediapipe
+    record_parser.add_argument("--tracker", choices=("holistic", "hands-pose"), default="holistic")
+    record_parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=None)
+
+    eval_parser = commands.add_parser("eval", help="Replay recordings and score the commits")
+    eval_parser.add_argument("recordings", nargs="+", help="Recording .npz files (reference in <name>.json)")
+    eval_parser.add_argument("--model", default=os.path.join(root_dir, "wlasl_demo.keras"))
+    eval_parser.add_argument("--tflite", default=os.path.join(root_dir, "wlasl_demo.tflite"),
+                             help="Used instead of --model when it exists, like asl.py")
+    eval_parser.add_argument("--actions", default=os.path.join(root_dir, "actions.json"))
+    for name, default in DEFAULT_PARAMS.items():
+        eval_parser.add_argument("--" + name.replace("_", "-"), dest=name,
+                                 help=f"Comma separated values to sweep (default: {default})")
+    eval_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    eval_parser.add_argument("--top", type=int, default=10, help="Parameter sets to print")
+    eval_parser.add_argument("--json", help="Write all results to this file")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        frames = record_video(args.video, args.output, args.tracker, args.model_complexity)
+        print(f"[OK] Recorded {frames} frames to {args.output}")
+    else:
+        run_eval(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# ============================================================
+# Indexed WLASL_v0.3.json
+# - build: parses WLASL_v0.3.json once into a SQLite file next to
+#   it, one row per instance with gloss, split, signer_id and
+#   source indexed
+# - select: streams the instances of a vocabulary (optionally only
+#   some splits, signers or sources) out as a wlasl_subset.json,
+#   without loading the full dataset
+# - stats: instance counts per split and source
+# The index is rebuilt automatically when WLASL_v0.3.json changes.
+#
+#   python ml/wlasl_index.py build
+#   python ml/wlasl_index.py select --glosses hello "thank you" yes -o ml/wlasl_subset.json
+#   python ml/wlasl_index.py select --glosses-file words.txt --split train val --source aslbrick
+# ============================================================
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+WLASL_PATH = os.path.join(script_dir, "WLASL_v0.3.json")
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE glosses (id INTEGER PRIMARY KEY, gloss TEXT NOT NULL);
+CREATE TABLE instances (
+    gloss_id INTEGER NOT NULL REFERENCES glosses(id),
+    position INTEGER NOT NULL,
+    video_id TEXT,
+    split TEXT,
+    signer_id INTEGER,
+    source TEXT,
+    record TEXT NOT NULL
+);
+"""
+# Created after the bulk insert, which is faster than keeping them up to date
+INDEXES = """
+CREATE INDEX glosses_gloss ON glosses (gloss);
+CREATE INDEX instances_gloss ON instances (gloss_id, position);
+CREATE INDEX instances_split ON instances (split);
+CREATE INDEX instances_signer ON instances (signer_id);
+CREATE INDEX instances_source ON instances (source);
+"""
+
+
+def index_path_for(wlasl_path):
+    return os.path.splitext(wlasl_path)[0] + ".sqlite"
+
+
+def source_signature(wlasl_path):
+    """Size and mtime of the json, the index is stale when they change"""
+    st = os.stat(wlasl_path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def build_index(wlasl_path=WLASL_PATH, db_path=None):
+    """Parse WLASL_v0.3.json into a fresh SQLite index, returns its path"""
+    db_path = db_path or index_path_for(wlasl_path)
+    with open(wlasl_path, "r") as f:
+        data = json.load(f)
+
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            for gloss_id, entry in enumerate(data):
+                conn.execute("INSERT INTO glosses (id, gloss) VALUES (?, ?)", (gloss_id, entry["gloss"]))
+                conn.executemany(
+                    "INSERT INTO instances VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((gloss_id, position, inst.get("video_id"), inst.get("split"), inst.get("signer_id"),
+                      inst.get("source"), json.dumps(inst, separators=(",", ":")))
+                     for position, inst in enumerate(entry.get("instances", []))))
+            conn.executescript(INDEXES)
+            conn.execute("INSERT INTO meta VALUES ('source', ?)", (source_signature(wlasl_path),))
+    finally:
+        conn.close()
+    # Readers never see a half built index
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+def open_index(wlasl_path=WLASL_PATH, db_path=None):
+    """Connection to the index of wlasl_path, (re)built first if it is missing or stale"""
+    db_path = db_path or index_path_for(wlasl_path)
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        if not os.path.exists(wlasl_path) or (row and row[0] == source_signature(wlasl_path)):
+            return conn
+        conn.close()
+        print(f"{os.path.basename(wlasl_path)} changed, rebuilding the index")
+    elif not os.path.exists(wlasl_path):
+        raise SystemExit(f"Error: {wlasl_path} not found")
+    else:
+        print(f"Building index for {os.path.basename(wlasl_path)} (only needed once)")
+    build_index(wlasl_path, db_path)
+    return sqlite3.connect(db_path)
+
+
+def gloss_count(conn):
+    return conn.execute("SELECT COUNT(*) FROM glosses").fetchone()[0]
+
+
+def _in(column, values, params):
+    params.extend(values)
+    return f"{column} IN ({', '.join('?' * len(values))})"
+
+
+def select_subset(conn, glosses, splits=None, signers=None, sources=None):
+    """Yield {gloss, instances} entries for the given glosses, in WLASL order
+
+    Like create_division.py did, every WLASL entry of a gloss is kept, also
+    when none of its instances match (its instances are then empty).
+    """
+    params = []
+    match = ["i.gloss_id = g.id"]
+    if splits:
+        match.append(_in("i.split", list(splits), params))
+    if signers:
+        match.append(_in("i.signer_id", [int(s) for s in signers], params))
+    if sources:
+        match.append(_in("i.source", list(sources), params))
+    where = _in("g.gloss", list(glosses), params)
+    rows = conn.execute(
+        "SELECT g.id, g.gloss, i.record FROM glosses g "
+        f"LEFT JOIN instances i ON {' AND '.join(match)} "
+        f"WHERE {where} ORDER BY g.id, i.position", params)
+
+    entry = entry_id = None
+    for gloss_id, gloss, record in rows:
+        if entry is None or entry_id != gloss_id:
+            if entry is not None:
+                yield entry
+            entry, entry_id = {"gloss": gloss, "instances": []}, gloss_id
+        if record is not None:
+            entry["instances"].append(json.loads(record))
+    if entry is not None:
+        yield entry
+
+
+def write_subset(path, entries):
+    """Stream entries to a wlasl_subset.json, returns how many were written
+
+    The output is the same as json.dump(list(entries), f, indent=4).
+    """
+    count = 0
+    with open(path, "w") as f:
+        f.write("[")
+        for entry in entries:
+            f.write(",\n    " if count else "\n    ")
+            # Strings are escaped, so every newline is between two lines of the dump
+            f.write(json.dumps(entry, indent=4).replace("\n", "\n    "))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
+
+
+def print_stats(conn):
+    """Instance counts per split and per source"""
+    total = conn.execute("SELECT COUNT(*) FROM instances").fetchone()[0]
+    signers = conn.execute("SELECT COUNT(DISTINCT signer_id) FROM instances").fetchone()[0]
+    print(f"{gloss_count(conn)} glosses, {total} instances, {signers} signers")
+    for facet in ("split", "source"):
+        print(f"By {facet}:")
+        for value, count in conn.execute(
+                f"SELECT {facet}, COUNT(*) FROM instances GROUP BY {facet} ORDER BY COUNT(*) DESC"):
+            print(f"  {value}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index WLASL_v0.3.json and select vocabulary subsets")
+    parser.add_argument("--wlasl", default=WLASL_PATH, help="Path to WLASL_v0.3.json")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="(Re)build the index")
+    commands.add_parser("stats", help="Instance counts per split and source")
+
+    select_parser = commands.add_parser("select", help="Write a wlasl_subset.json for a vocabulary")
+    words = select_parser.add_mutually_exclusive_group(required=True)
+    words.add_argument("--glosses", nargs="+")
+    words.add_argument("--glosses-file", help="Text file with one gloss per line")
+    select_parser.add_argument("--split", nargs="+", help="Only these splits (train, val, test)")
+    select_parser.add_argument("--signer", nargs="+", type=int, help="Only these signer_ids")
+    select_parser.add_argument("--source", nargs="+", help="Only these sources")
+    select_parser.add_argument("-o", "--output", default=os.path.join(script_dir, "wlasl_subset.json"))
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        path = build_index(args.wlasl)
+        print(f"[OK] Built {path} in {time.perf_counter() - start:.1f} s")
+        return
+
+    conn = open_index(args.wlasl)
+    try:
+        if args.command == "stats":
+            print_stats(conn)
+            return
+
+        glosses = args.glosses
+        if args.glosses_file:
+            with open(args.glosses_file, "r") as f:
+                glosses = [line.strip() for line in f if line.strip()]
+        found, matched = set(), set()
+
+        def track(entries):
+            for entry in entries:
+                found.add(entry["gloss"])
+                if entry["instances"]:
+                    matched.add(entry["gloss"])
+                yield entry
+
+        start = time.perf_counter()
+        count = write_subset(args.output, track(select_subset(conn, glosses, args.split, args.signer, args.source)))
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Selected {len(found)} of {len(set(glosses))} glosses ({count} entries) "
+              f"in {elapsed:.0f} ms -> {args.output}")
+        missing = set(glosses) - found
+        if missing:
+            print(f"Warning: {len(missing)} glosses are not in WLASL: {', '.join(sorted(missing))}")
+        empty = found - matched
+        if empty:
+            print(f"Warning: {len(empty)} glosses have no matching instances: {', '.join(sorted(empty))}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
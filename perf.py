@@ -0,0 +1,76 @@
+import collections
+import time
+
+
+class LatencyStats:
+    """Rolling latency samples with percentile summaries"""
+
+    def __init__(self, name, maxlen=1000):
+        self.name = name
+        self.samples = collections.deque(maxlen=maxlen)
+        self.count = 0
+
+    def add(self, seconds):
+        """Record one latency sample in seconds"""
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, p):
+        """p-th percentile of the recent samples, in seconds"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def mean(self):
+        """Mean of the recent samples, in seconds"""
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    def summary(self):
+        """Return p50/p99/mean in milliseconds"""
+        return {
+            'count': self.count,
+            'p50_ms': self.percentile(50) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'mean_ms': self.mean() * 1000,
+        }
+
+    def __str__(self):
+        s = self.summary()
+        return f"{self.name}: p50 {s['p50_ms']:.2f} ms, p99 {s['p99_ms']:.2f} ms"
+
+
+class StageTimes:
+    """Named LatencyStats for the stages of a per-frame pipeline
+
+    Usage:
+        times = StageTimes()
+        start = time.perf_counter()
+        ...
+        start = times.lap('compose', start)
+    """
+
+    def __init__(self, maxlen=1000):
+        self.maxlen = maxlen
+        self.stages = {}
+
+    def add(self, name, seconds):
+        """Record a sample for a stage, creating it on first use"""
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = LatencyStats(name, self.maxlen)
+        stats.add(seconds)
+
+    def lap(self, name, start):
+        """Record the time since start for a stage and return the current time"""
+        now = time.perf_counter()
+        self.add(name, now - start)
+        return now
+
+    def summary(self):
+        """Return {stage: summary dict} for every stage"""
+        return {name: stats.summary() for name, stats in self.stages.items()}
+
+    def __str__(self):
+        return "\n".join(f"  {stats}" for stats in self.stages.values())
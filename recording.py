@@ -0,0 +1,71 @@
+import numpy as np
+
+from keypoints import FEATURE_DIM
+
+
+class KeypointRecorder:
+    """Records per-frame keypoints, hand presence and timestamps of a session
+
+    The recording can be replayed offline through the classifier and the
+    commit logic (ml/replay_eval.py) without a webcam. Frames go into
+    preallocated arrays that double when full, so recording adds one row copy
+    per frame. Timestamps are stored relative to the first frame. Words
+    committed live are kept too, to compare the replay against.
+    """
+
+    def __init__(self, dim=FEATURE_DIM, capacity=1024):
+        self.dim = dim
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._hands = np.zeros(capacity, dtype=bool)
+        self._keypoints = np.zeros((capacity, dim), dtype=np.float32)
+        self._count = 0
+        self._start = None
+        self._commits = []  # (time, word)
+
+    def __len__(self):
+        return self._count
+
+    def _grow(self):
+        capacity = 2 * len(self._times)
+        self._times = np.resize(self._times, capacity)
+        self._hands = np.resize(self._hands, capacity)
+        keypoints = np.zeros((capacity, self.dim), dtype=np.float32)
+        keypoints[:self._count] = self._keypoints[:self._count]
+        self._keypoints = keypoints
+
+    def add(self, now, has_hands, keypoints=None):
+        """Record one frame, keypoints are zeros when not given (e.g. no hands)"""
+        if self._start is None:
+            self._start = now
+        if self._count == len(self._times):
+            self._grow()
+        i = self._count
+        self._times[i] = now - self._start
+        self._hands[i] = has_hands
+        if keypoints is None:
+            self._keypoints[i] = 0.0
+        else:
+            self._keypoints[i] = keypoints
+        self._count += 1
+
+    def add_commit(self, now, word):
+        """Record a word committed live"""
+        self._commits.append((now - (self._start if self._start is not None else now), word))
+
+    def save(self, path):
+        """Write the recording as a .npz"""
+        n = self._count
+        np.savez_compressed(
+            path,
+            times=self._times[:n],
+            hands=self._hands[:n],
+            keypoints=self._keypoints[:n],
+            commit_times=np.array([t for t, _ in self._commits], dtype=np.float64),
+            commit_words=np.array([w for _, w in self._commits], dtype=str),
+        )
+
+
+def load_recording(path):
+    """Dict with times, hands, keypoints, commit_times and commit_words of a recording"""
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
@@ -0,0 +1,281 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from keypoints import FEATURE_DIM, SEQUENCE_LENGTH
+from perf import LatencyStats
+
+
+class KerasClassifier:
+    """Single-sample inference for the Keras sign classifier
+
+    model.predict() builds a dataset, runs callbacks and handles batching on
+    every call, which costs more than the recurrent layers themselves for a
+    single (1, 30, 258) window. This traces model.__call__ once with a fixed
+    input signature and calls that graph directly. It is warmed up at load
+    time so the first real sign doesn't pay for tracing.
+    """
+
+    name = 'keras'
+
+    def __init__(self, model_path, warmup=5):
+        import tensorflow as tf  # Imported here so other backends don't pay for it
+
+        self.model = tf.keras.models.load_model(model_path)
+        self._infer = tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec((1, SEQUENCE_LENGTH, FEATURE_DIM), tf.float32)],
+        )
+        self.latency = LatencyStats('inference')
+        self.warmup(warmup)
+
+    def warmup(self, runs):
+        """Trace the graph and run it a few times before real frames arrive"""
+        x = np.zeros((1, SEQUENCE_LENGTH, FEATURE_DIM), dtype=np.float32)
+        for _ in range(runs):
+            self._infer(x)
+
+    def predict(self, x):
+        """Class probabilities for one (1, 30, 258) float32 window"""
+        start = time.perf_counter()
+        probs = self._infer(x).numpy()[0]
+        self.latency.add(time.perf_counter() - start)
+        return probs
+
+
+def _tflite_interpreter_class():
+    """Lightest TFLite interpreter that is installed, full TensorFlow last"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteClassifier:
+    """Sign classifier running an exported .tflite model (see ml/export_tflite.py)
+
+    Uses ai_edge_litert or tflite_runtime when available, so the full
+    TensorFlow stack never has to be imported. Quantized inputs/outputs are
+    converted using the tensor quantization parameters.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None, warmup=5):
+        Interpreter = _tflite_interpreter_class()
+        self.interpreter = Interpreter(model_path=str(model_path), num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+
+        input_details = self.interpreter.get_input_details()[0]
+        output_details = self.interpreter.get_output_details()[0]
+        self._input_index = input_details['index']
+        self._input_dtype = input_details['dtype']
+        self._input_quantization = input_details['quantization']
+        self._output_index = output_details['index']
+        self._output_quantization = output_details['quantization']
+
+        self.latency = LatencyStats('inference')
+        self.warmup(warmup)
+
+    def warmup(self, runs):
+        """Run the interpreter a few times before real frames arrive"""
+        x = np.zeros((1, SEQUENCE_LENGTH, FEATURE_DIM), dtype=np.float32)
+        for _ in range(runs):
+            self._invoke(x)
+
+    def _invoke(self, x):
+        if self._input_dtype != np.float32:
+            scale, zero_point = self._input_quantization
+            x = np.round(x / scale + zero_point).astype(self._input_dtype)
+        self.interpreter.set_tensor(self._input_index, x)
+        self.interpreter.invoke()
+        probs = self.interpreter.get_tensor(self._output_index)[0]
+        scale, zero_point = self._output_quantization
+        if scale:
+            probs = (probs.astype(np.float32) - zero_point) * scale
+        return probs
+
+    def predict(self, x):
+        """Class probabilities for one (1, 30, 258) float32 window"""
+        start = time.perf_counter()
+        probs = self._invoke(x)
+        self.latency.add(time.perf_counter() - start)
+        return probs
+
+
+def load_classifier(model_path, tflite_path=None):
+    """TFLite backend if the exported model exists, otherwise the Keras model"""
+    if tflite_path and os.path.exists(tflite_path):
+        try:
+            return TFLiteClassifier(tflite_path)
+        except Exception as e:
+            print(f"Warning: Could not load {tflite_path} ({e}), falling back to {model_path}")
+    return KerasClassifier(model_path)
+
+
+class InferenceWorker:
+    """Runs the classifier on its own thread, always on the newest window
+
+    The video loop hands over every full keypoint window with submit(). The
+    window is copied into a pending buffer, replacing (and counting as skipped)
+    any window the worker hasn't started on yet, so a slow predict never holds
+    up the video and never works through a backlog of stale windows. The tag
+    passed to submit() comes back with the result so the caller can tell
+    which frame it belongs to.
+    """
+
+    def __init__(self, classifier, length=SEQUENCE_LENGTH, dim=FEATURE_DIM):
+        self.classifier = classifier
+        self._pending = np.zeros((1, length, dim), dtype=np.float32)
+        self._working = np.zeros((1, length, dim), dtype=np.float32)
+        self._pending_tag = None
+        self._has_pending = False
+        self._result = None
+        self._running = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self.windows_submitted = 0
+        self.windows_skipped = 0
+        self.windows_classified = 0
+
+    def start(self):
+        """Start the inference thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the inference thread"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, window, tag=None):
+        """Queue a (1, length, dim) window, replacing one that hasn't started yet"""
+        with self._cond:
+            if self._has_pending:
+                self.windows_skipped += 1
+            np.copyto(self._pending, window)
+            self._pending_tag = tag
+            self._has_pending = True
+            self.windows_submitted += 1
+            self._cond.notify()
+
+    def take_result(self):
+        """Return (probs, tag) of the newest finished window, or None if nothing new"""
+        with self._cond:
+            result, self._result = self._result, None
+            return result
+
+    def run(self):
+        """Thread function classifying the newest submitted window"""
+        while True:
+            with self._cond:
+                while self._running and not self._has_pending:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                # Swap buffers so submit() can keep writing while we predict
+                self._pending, self._working = self._working, self._pending
+                tag = self._pending_tag
+                self._has_pending = False
+
+            try:
+                probs = self.classifier.predict(self._working)
+            except Exception as e:
+                print(f"Inference error: {e}")
+                continue
+
+            with self._cond:
+                self._result = (probs, tag)
+                self.windows_classified += 1
+
+    def stats(self):
+        """Return window counters"""
+        return {
+            'submitted': self.windows_submitted,
+            'classified': self.windows_classified,
+            'skipped': self.windows_skipped,
+        }
+
+
+class StrideController:
+    """Decides on which frames a full window is sent to the classifier
+
+    Consecutive windows overlap by all but one frame, so classifying every
+    frame mostly repeats work. With a fixed stride every Nth frame is used.
+    In adaptive mode the stride goes up when the worker had to skip windows
+    (CPU saturated) or the same label has been confident for a while, and
+    drops straight back to min_stride when the label changes or confidence
+    falls, so transitions between signs are still seen at the configured
+    rate. min_stride defaults to the starting stride.
+    """
+
+    def __init__(self, stride=1, adaptive=False, min_stride=None, max_stride=6,
+                 stable_results=5, stable_conf=0.5):
+        self.stride = stride
+        self.adaptive = adaptive
+        self.min_stride = stride if min_stride is None else min_stride
+        self.max_stride = max_stride
+        self.stable_results = stable_results
+        self.stable_conf = stable_conf
+
+        self._frames_since = 0
+        self._stable = 0
+        self._last_pred = None
+        self._last_skipped = 0
+
+        self.frames = 0
+        self.submitted = 0
+
+    def should_submit(self):
+        """Call once per frame with a full window, True if it should be classified"""
+        self.frames += 1
+        self._frames_since += 1
+        if self._frames_since >= self.stride:
+            self._frames_since = 0
+            self.submitted += 1
+            return True
+        return False
+
+    def reset(self):
+        """Window was cleared, react quickly when signing resumes"""
+        self._frames_since = 0
+        self._stable = 0
+        self._last_pred = None
+        if self.adaptive:
+            self.stride = self.min_stride
+
+    def update(self, pred, conf, skipped_total):
+        """Feed back a classification result and the worker's skipped-window count"""
+        saturated = skipped_total > self._last_skipped
+        self._last_skipped = skipped_total
+        if not self.adaptive:
+            return
+
+        if pred != self._last_pred or conf < self.stable_conf:
+            # Transition (or unsure), look at every frame again unless we can't keep up
+            self._stable = 0
+            if not saturated:
+                self.stride = self.min_stride
+        else:
+            self._stable += 1
+        self._last_pred = pred
+
+        if saturated or self._stable >= self.stable_results:
+            self.stride = min(self.stride + 1, self.max_stride)
+            self._stable = 0
+
+    def frames_per_inference(self):
+        """Average stride actually used"""
+        return self.frames / self.submitted if self.submitted else 0.0
@@ -0,0 +1,161 @@
+import time
+
+import numpy as np
+
+# Smoothing modes for PredictionSmoother
+EMA = "ema"      # exponential moving average of the probability vectors
+MEAN = "mean"    # mean probability vector over the last window_seconds
+VOTE = "vote"    # majority vote of the argmax labels over the last window_seconds
+SMOOTHING_MODES = (EMA, MEAN, VOTE)
+
+
+class PredictionSmoother:
+    """Turns a stream of class probability vectors into committed words
+
+    update() keeps the contract of the original update_prediction:
+    (committed_word_or_empty_string, live_label, live_conf). Instead of a
+    Python list of labels re-counted on every call, recent predictions live
+    in a fixed numpy ring with running sums, so each update is constant time.
+
+    EMA and MEAN smooth the probabilities themselves and gate commits on the
+    smoothed confidence of the winning label. A single confident frame can't
+    trigger a commit, and a sign that is consistently likely can commit
+    without waiting for a full window of votes. VOTE is the original
+    majority vote over the argmax labels, gated on the raw confidence.
+    """
+
+    def __init__(self, labels, mode=EMA, window_seconds=0.5, min_votes=3, idle_thresh=0.4,
+                 commit_thresh=0.5, hold_time=0.5, repeat_delay=5.0, max_window=64):
+        if mode not in SMOOTHING_MODES:
+            raise ValueError(f"Unknown smoothing mode '{mode}', expected one of {SMOOTHING_MODES}")
+        self.labels = labels
+        self.mode = mode
+        self.window_seconds = window_seconds
+        self.min_votes = min_votes
+        self.idle_thresh = idle_thresh
+        self.commit_thresh = commit_thresh
+        self.hold_time = hold_time
+        self.repeat_delay = repeat_delay
+
+        num_classes = len(labels)
+        self._capacity = max_window
+        self._times = np.zeros(max_window, dtype=np.float64)
+        self._probs = np.zeros((max_window, num_classes), dtype=np.float64)
+        self._preds = np.zeros(max_window, dtype=np.int64)
+        self._prob_sum = np.zeros(num_classes, dtype=np.float64)
+        self._votes = np.zeros(num_classes, dtype=np.int64)
+        self._ema = np.zeros(num_classes, dtype=np.float64)
+
+        self.last_commit = None
+        self.last_commit_time = None
+        self.reset()
+
+    def reset(self):
+        """Forget recent predictions and the pending hold (e.g. hands went down)"""
+        self._head = 0      # ring slot for the next prediction
+        self._size = 0
+        self._updates = 0
+        self._hist_start = None
+        self._ema_time = None
+        self._prob_sum[:] = 0.0
+        self._votes[:] = 0
+        self.hold_label = None
+        self.hold_start = None
+
+    def forget_last_commit(self):
+        """Allow the last committed word to be committed again straight away"""
+        self.last_commit = None
+        self.last_commit_time = None
+
+    def _evict_oldest(self):
+        tail = (self._head - self._size) % self._capacity
+        self._prob_sum -= self._probs[tail]
+        self._votes[self._preds[tail]] -= 1
+        self._size -= 1
+
+    def _push(self, probs, pred, now):
+        """Add a prediction to the ring and drop the ones older than the window"""
+        while self._size and (self._size == self._capacity or
+                              self._times[(self._head - self._size) % self._capacity] < now - self.window_seconds):
+            self._evict_oldest()
+        self._times[self._head] = now
+        self._probs[self._head] = probs
+        self._preds[self._head] = pred
+        self._prob_sum += probs
+        self._votes[pred] += 1
+        self._head = (self._head + 1) % self._capacity
+        self._size += 1
+
+    def _smoothed(self, probs, now):
+        """(label, confidence) after smoothing, or None while still warming up"""
+        if self.mode == EMA:
+            if self._ema_time is None:
+                self._ema[:] = probs
+            else:
+                # Time-based weight so the smoothing doesn't depend on the inference rate
+                alpha = 1.0 - np.exp(-(now - self._ema_time) / self.window_seconds)
+                self._ema += alpha * (probs - self._ema)
+            self._ema_time = now
+            if self._updates < self.min_votes:
+                return None
+            label = int(np.argmax(self._ema))
+            return label, float(self._ema[label])
+
+        if self.mode == MEAN:
+            if self._updates < self.min_votes:
+                return None
+            label = int(np.argmax(self._prob_sum))
+            return label, float(self._prob_sum[label] / self._size)
+
+        # VOTE: wait for a full window like the original majority vote
+        if (now - self._hist_start) < self.window_seconds or self._size < self.min_votes:
+            return None
+        label = int(np.argmax(self._votes))
+        pred = int(np.argmax(probs))
+        return label, float(probs[pred])
+
+    def update(self, probs, now=None):
+        """
+        Returns: (committed_word_or_empty_string, live_label, live_conf)
+        """
+        if now is None:
+            now = time.time()
+        probs = np.asarray(probs, dtype=np.float64)
+        pred = int(np.argmax(probs))
+        conf = float(probs[pred])
+
+        # idle gate based on confidence
+        if conf < self.idle_thresh:
+            self.reset()
+            return "", "Idle", conf
+
+        if self._hist_start is None:
+            self._hist_start = now
+        self._updates += 1
+        self._push(probs, pred, now)
+
+        smoothed = self._smoothed(probs, now)
+        if smoothed is None:
+            return "", self.labels[pred], conf
+        maj, maj_conf = smoothed
+
+        # require enough confidence to commit
+        if maj_conf < self.commit_thresh:
+            return "", self.labels[maj], maj_conf
+
+        # debounce: require stable label for hold_time seconds
+        if self.hold_label != maj:
+            self.hold_label = maj
+            self.hold_start = now
+            return "", self.labels[maj], maj_conf
+
+        if (now - self.hold_start) >= self.hold_time:
+            word = self.labels[maj]
+            # Allow repeat if enough time has passed since last commit
+            if word != self.last_commit or (self.last_commit_time is not None and
+                                            (now - self.last_commit_time) >= self.repeat_delay):
+                self.last_commit = word
+                self.last_commit_time = now
+                return word, self.labels[maj], maj_conf
+
+        return "", self.labels[maj], maj_conf
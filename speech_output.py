@@ -0,0 +1,134 @@
+import collections
+import threading
+import time
+
+from perf import LatencyStats
+
+
+class SpeechWorker:
+    """Speaks committed words on one persistent thread with a bounded queue
+
+    Words wait in a queue of at most max_queue entries; when it is full the
+    oldest word is dropped. Once a word arrives the worker waits merge_window
+    seconds for more, then speaks everything that is queued as one utterance,
+    so words signed close together come out as a phrase instead of one
+    runAndWait per word. Words that have waited longer than max_age (e.g.
+    while a long utterance was being spoken) are dropped as stale.
+    """
+
+    def __init__(self, engine, max_queue=5, merge_window=0.4, max_age=3.0):
+        self.engine = engine
+        self.max_queue = max_queue
+        self.merge_window = merge_window
+        self.max_age = max_age
+
+        self._queue = collections.deque()  # (text, time queued)
+        self._running = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self.words_queued = 0
+        self.words_dropped = 0  # queue full
+        self.words_stale = 0    # waited longer than max_age
+        self.utterances = 0
+        self.max_depth = 0
+        self.speak_latency = LatencyStats('commit to speech')
+        self.speak_times = LatencyStats('utterance')
+
+    def start(self):
+        """Start the speech thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the speech thread, dropping anything still queued"""
+        with self._cond:
+            self._running = False
+            self._queue.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def say(self, text):
+        """Queue text to be spoken, never blocks"""
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.words_dropped += 1
+            self._queue.append((text, time.perf_counter()))
+            self.words_queued += 1
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify()
+
+    def depth(self):
+        """Number of words waiting to be spoken"""
+        with self._cond:
+            return len(self._queue)
+
+    def _next_utterance(self):
+        """Block until words are queued, then return them merged, or None when stopped"""
+        with self._cond:
+            while self._running and not self._queue:
+                self._cond.wait()
+            if not self._running:
+                return None
+
+            # Give words signed right after this one a chance to join the utterance
+            deadline = self._queue[-1][1] + self.merge_window
+            while self._running and len(self._queue) < self.max_queue:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                deadline = self._queue[-1][1] + self.merge_window if self._queue else deadline
+
+            now = time.perf_counter()
+            words = []
+            while self._queue:
+                text, queued_at = self._queue.popleft()
+                if now - queued_at > self.max_age:
+                    self.words_stale += 1
+                    continue
+                words.append((text, queued_at))
+            return words
+
+    def run(self):
+        """Thread function speaking queued words"""
+        while True:
+            words = self._next_utterance()
+            if words is None:
+                break
+            if not words:
+                continue
+
+            start = time.perf_counter()
+            for _, queued_at in words:
+                self.speak_latency.add(start - queued_at)
+            try:
+                self.engine.say(" ".join(text for text, _ in words))
+                self.engine.runAndWait()
+            except Exception as e:
+                print(f"TTS error: {e}")
+            self.speak_times.add(time.perf_counter() - start)
+            self.utterances += 1
+
+    def stats(self):
+        """Return speech counters"""
+        return {
+            'words_queued': self.words_queued,
+            'words_dropped': self.words_dropped,
+            'words_stale': self.words_stale,
+            'utterances': self.utterances,
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+        }
+
+    def print_stats(self):
+        """Print a summary of the speech counters and latencies"""
+        s = self.stats()
+        print(f"Speech stats: {s['words_queued']} words in {s['utterances']} utterances, "
+              f"{s['words_dropped']} dropped (queue full), {s['words_stale']} stale, "
+              f"max queue depth {s['max_depth']}")
+        print(f"  {self.speak_latency}")
+        print(f"  {self.speak_times}")
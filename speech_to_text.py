@@ -1,79 +1,25 @@
 import cv2
 import pyvirtualcam
 from pyvirtualcam import PixelFormat
-import json
 import sounddevice as sd
 import threading
-import queue
 import sys
 import time
 import platform
 import argparse
 import os
-import zipfile
-import urllib.request
-from pathlib import Path
-from vosk import KaldiRecognizer, Model
+import signal
+from vosk import KaldiRecognizer
 import argostranslate.package
 import argostranslate.translate
-
-# Language model configurations
-LANGUAGE_MODELS = {
-    'en': {
-        'name': 'vosk-model-small-en-us-0.15',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip',
-        'display_name': 'English'
-    },
-    'es': {
-        'name': 'vosk-model-small-es-0.42',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-es-0.42.zip',
-        'display_name': 'Spanish'
-    },
-    'fr': {
-        'name': 'vosk-model-small-fr-0.22',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-fr-0.22.zip',
-        'display_name': 'French'
-    },
-    'de': {
-        'name': 'vosk-model-small-de-0.15',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-de-0.15.zip',
-        'display_name': 'German'
-    },
-    'ru': {
-        'name': 'vosk-model-small-ru-0.22',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-ru-0.22.zip',
-        'display_name': 'Russian'
-    },
-    'zh': {
-        'name': 'vosk-model-small-cn-0.22',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-cn-0.22.zip',
-        'display_name': 'Chinese'
-    },
-    'ja': {
-        'name': 'vosk-model-small-ja-0.22',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-ja-0.22.zip',
-        'display_name': 'Japanese'
-    },
-    'pt': {
-        'name': 'vosk-model-small-pt-0.3',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-pt-0.3.zip',
-        'display_name': 'Portuguese'
-    },
-    'it': {
-        'name': 'vosk-model-small-it-0.22',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-it-0.22.zip',
-        'display_name': 'Italian'
-    },
-    'hi': {
-        'name': 'vosk-model-small-hi-0.22',
-        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-hi-0.22.zip',
-        'display_name': 'Hindi'
-    }
-}
-
-# Directory paths for models
-MODELS_DIR = Path('models')
-VOSK_MODELS_DIR = MODELS_DIR / 'vosk'
+from audio_pipeline import AudioRingBuffer, TranscriptionWorker, OVERFLOW_POLICIES, DROP_OLDEST
+from translation import CachedTranslator, TranslationStage
+from captions import CaptionSprite
+from perf import StageTimes
+from vosk_models import LANGUAGE_MODELS, MODELS_DIR, load_model
+from video_pipeline import DEFAULT_FPS, FrameCapture, capture_fps
+
+# Directory paths for models (Vosk models live in vosk_models.VOSK_MODELS_DIR)
 TRANSLATOR_MODELS_DIR = MODELS_DIR / 'translator'
 
 # Map Vosk language codes to Argos Translate language codes
@@ -95,6 +41,7 @@ SAMPLE_RATE = 16000
 # Global variables for language and translation
 selected_language = 'en'
 translator = None
+translation_stage = None
 
 # Set this to None to use default device, or specify device index/name
 DEVICE = None  # Change to device index (int) or device name (str) to use external mic
@@ -113,10 +60,11 @@ if not cap.isOpened():
 
 width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-fps = 30
+fps = DEFAULT_FPS  # Replaced by the measured capture rate once capture starts
 
 # Caption settings
 caption_text = "Listening..."  # Will be updated by Vosk
+caption_seq = 0  # Bumped on every caption change so late translations can be discarded
 last_update_time = time.time()  # Track when caption was last updated
 CAPTION_TIMEOUT = 2.0  # Seconds before caption disappears
 caption_y = height - 50  # Bottom with padding
@@ -126,10 +74,12 @@ font_color = (255, 255, 255)
 font_thickness = 2
 outline_color = (0, 0, 0)
 outline_thickness = 4
-MAX_TEXT_WIDTH_RATIO = 0.85  # Maximum text width as ratio of frame width
+# Caption is mirrored so it reads correctly in mirrored self-view
+caption_sprite = CaptionSprite(font, font_scale, font_color, font_thickness, outline_color, outline_thickness, mirror=True)
 
-# Audio queue for Vosk
-audio_queue = queue.Queue()
+# Audio ring buffer for Vosk (created once the latency options are parsed)
+BLOCK_SIZE = 4000  # Smaller chunks (0.25s) for faster partial results
+audio_buffer = None
 caption_lock = threading.Lock()
 
 def install_argos_package(from_code, to_code='en'):
@@ -218,84 +168,6 @@ def get_argos_translator(from_code, to_code='en'):
         print(f"Available languages: {[l.code for l in installed_languages]}")
     return None
 
-def download_model(language_code):
-    """Download and extract Vosk model for specified language"""
-    if language_code not in LANGUAGE_MODELS:
-        print(f"Error: Language '{language_code}' not supported.")
-        print(f"Available languages: {', '.join(LANGUAGE_MODELS.keys())}")
-        return False
-    
-    model_info = LANGUAGE_MODELS[language_code]
-    model_path = model_info['name']
-    model_url = model_info['url']
-    zip_filename = f"{model_path}.zip"
-    
-    # Ensure vosk models directory exists
-    VOSK_MODELS_DIR.mkdir(parents=True, exist_ok=True)
-    
-    print(f"\nDownloading {model_info['display_name']} model...")
-    print(f"URL: {model_url}")
-    print("This may take a few minutes depending on your connection...")
-    
-    try:
-        # Download with progress
-        def reporthook(blocknum, blocksize, totalsize):
-            downloaded = blocknum * blocksize
-            if totalsize > 0:
-                percent = min(downloaded * 100 / totalsize, 100)
-                sys.stdout.write(f"\rProgress: {percent:.1f}% ({downloaded / 1024 / 1024:.1f} MB / {totalsize / 1024 / 1024:.1f} MB)")
-                sys.stdout.flush()
-        
-        urllib.request.urlretrieve(model_url, zip_filename, reporthook)
-        print("\n\nExtracting model...")
-        
-        # Extract zip file to vosk models directory
-        with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
-            zip_ref.extractall(str(VOSK_MODELS_DIR))
-        
-        # Remove zip file
-        os.remove(zip_filename)
-        print(f"Model downloaded and extracted successfully to: {VOSK_MODELS_DIR / model_path}")
-        return True
-        
-    except Exception as e:
-        print(f"\n\nError downloading model: {e}")
-        if os.path.exists(zip_filename):
-            os.remove(zip_filename)
-        return False
-
-def load_model(language_code):
-    """Load Vosk model, downloading if necessary"""
-    if language_code not in LANGUAGE_MODELS:
-        print(f"Error: Language '{language_code}' not supported.")
-        print(f"Available languages: {', '.join(LANGUAGE_MODELS.keys())}")
-        return None
-    
-    model_name = LANGUAGE_MODELS[language_code]['name']
-    display_name = LANGUAGE_MODELS[language_code]['display_name']
-    model_path = VOSK_MODELS_DIR / model_name
-    
-    # Check if model exists
-    if not model_path.exists():
-        print(f"\n{display_name} model not found at: {model_path}")
-        response = input("Would you like to download it now? (y/n): ").strip().lower()
-        if response == 'y' or response == 'yes':
-            if not download_model(language_code):
-                return None
-        else:
-            print("Cannot proceed without model. Exiting.")
-            return None
-    
-    # Load the model
-    print(f"\nLoading {display_name} model from {model_path}...")
-    try:
-        model = Model(str(model_path))
-        print(f"{display_name} model loaded successfully!")
-        return model
-    except Exception as e:
-        print(f"Error loading Vosk model: {e}")
-        return None
-
 def list_devices():
     """List all available audio input devices."""
     print("\nAvailable audio input devices:")
@@ -324,141 +196,43 @@ def audio_callback(indata, frames, time, status):
     """Callback for audio input - collects audio data for Vosk"""
     if status:
         print(f"Audio status: {status}", file=sys.stderr)
-    # RawInputStream already provides int16 bytes, no conversion needed
-    audio_queue.put(bytes(indata))
-
-def transcribe_audio():
-    """Thread function to continuously transcribe audio using Vosk"""
+    # RawInputStream already provides int16 samples, copy them straight into the ring
+    audio_buffer.write(indata)
+
+def show_caption(text):
+    """Put text on screen and return its caption sequence number"""
+    global caption_text, caption_seq, last_update_time
+    with caption_lock:
+        caption_text = text
+        caption_seq += 1
+        last_update_time = time.time()
+        return caption_seq
+
+def show_final(text):
+    """Show a final result, handing it to the translator if needed"""
+    # Show the source text straight away, the translation replaces it when it lands
+    seq = show_caption(text)
+    if translation_stage:
+        translation_stage.submit(text, True, seq)
+    elif selected_language == 'en':
+        print(f"Transcribed: {text}")
+
+def show_partial(partial_text):
+    """Show a partial result, handing it to the translator if needed"""
+    seq = show_caption(partial_text)
+    if translation_stage:
+        translation_stage.submit(partial_text, False, seq)
+
+def show_translation(seq, text, translated_text, final):
+    """Swap in a translation unless newer text is already on screen"""
     global caption_text, last_update_time
-    
-    while True:
-        try:
-            # Process all available audio chunks from queue
-            while not audio_queue.empty():
-                try:
-                    data = audio_queue.get_nowait()
-                    
-                    # Process with Vosk
-                    if rec.AcceptWaveform(data):
-                        # Final result - complete sentence/phrase
-                        result = json.loads(rec.Result())
-                        text = result.get("text", "").strip()
-                        if text:
-                            # Translate if not English using local argos translator
-                            if selected_language != 'en' and translator:
-                                try:
-                                    translated_text = translator(text)
-                                    print(f"Original ({LANGUAGE_MODELS[selected_language]['display_name']}): {text}")
-                                    print(f"Translated (English): {translated_text}")
-                                    text = translated_text
-                                except Exception as e:
-                                    print(f"Translation error: {e}, using original text")
-                            
-                            with caption_lock:
-                                caption_text = text
-                                last_update_time = time.time()
-                            if selected_language == 'en':
-                                print(f"Transcribed: {text}")
-                    
-                    # Always check for partial results (even after AcceptWaveform)
-                    partial = json.loads(rec.PartialResult())
-                    partial_text = partial.get("partial", "").strip()
-                    if partial_text:
-                        # Translate partial if not English (fast local translation)
-                        if selected_language != 'en' and translator:
-                            try:
-                                translated_partial = translator(partial_text)
-                                partial_text = translated_partial
-                            except:
-                                pass  # Use original on error
-                        
-                        with caption_lock:
-                            caption_text = partial_text
-                            last_update_time = time.time()
-                except queue.Empty:
-                    break
-        except Exception as e:
-            print(f"Transcription error: {e}")
-
-def wrap_text(text, font, scale, thickness, max_width):
-    """Wrap text at word boundaries to fit within max_width"""
-    words = text.split()
-    if not words:
-        return []
-    
-    lines = []
-    current_line = []
-    
-    for word in words:
-        # Test line with new word
-        test_line = ' '.join(current_line + [word])
-        (test_width, _), _ = cv2.getTextSize(test_line, font, scale, thickness)
-        
-        if test_width <= max_width:
-            # Word fits on current line
-            current_line.append(word)
-        else:
-            # Word doesn't fit, start new line
-            if current_line:
-                lines.append(' '.join(current_line))
-            # Handle very long single word (break at character level)
-            (word_width, _), _ = cv2.getTextSize(word, font, scale, thickness)
-            if word_width > max_width:
-                # Break long word into characters
-                char_line = ""
-                for char in word:
-                    test_char_line = char_line + char
-                    (char_width, _), _ = cv2.getTextSize(test_char_line, font, scale, thickness)
-                    if char_width > max_width and char_line:
-                        lines.append(char_line)
-                        char_line = char
-                    else:
-                        char_line = test_char_line
-                if char_line:
-                    current_line = [char_line]
-                else:
-                    current_line = []
-            else:
-                current_line = [word]
-    
-    # Add remaining line
-    if current_line:
-        lines.append(' '.join(current_line))
-    
-    return lines if lines else [text]  # Fallback to original text if wrapping fails
-
-def add_caption(frame, text, y_position, font, scale, color, thickness, outline_color, outline_thickness):
-    """Add text caption with outline to frame, centered horizontally, with word wrapping"""
-    if not text:
-        return frame
-    
-    frame_width = frame.shape[1]
-    max_text_width = int(frame_width * MAX_TEXT_WIDTH_RATIO)
-    
-    # Wrap text into lines
-    lines = wrap_text(text, font, scale, thickness, max_text_width)
-    
-    # Calculate line height
-    (_, text_height), baseline = cv2.getTextSize("Ay", font, scale, thickness)
-    line_height = text_height + baseline + 5  # Add small padding between lines
-    
-    # Draw lines from bottom up
-    current_y = y_position
-    for line in reversed(lines):  # Draw last line first (at bottom)
-        # Calculate text size to center it horizontally
-        (text_width, _), _ = cv2.getTextSize(line, font, scale, thickness)
-        x_position = (frame_width - text_width) // 2
-        position = (x_position, current_y)
-        
-        # Draw outline (thicker, darker)
-        cv2.putText(frame, line, position, font, scale, outline_color, outline_thickness, cv2.LINE_AA)
-        # Draw main text (thinner, brighter)
-        cv2.putText(frame, line, position, font, scale, color, thickness, cv2.LINE_AA)
-        
-        # Move up for next line
-        current_y -= line_height
-    
-    return frame
+    if final:
+        print(f"Original ({LANGUAGE_MODELS[selected_language]['display_name']}): {text}")
+        print(f"Translated (English): {translated_text}")
+    with caption_lock:
+        if seq == caption_seq:
+            caption_text = translated_text
+            last_update_time = time.time()
 
 # Parse command-line arguments
 parser = argparse.ArgumentParser(
@@ -479,6 +253,17 @@ parser.add_argument('--list-languages', action='store_true',
                     help='List all available languages and exit')
 parser.add_argument('--list-devices', action='store_true',
                     help='List all available audio input devices and exit')
+parser.add_argument('--max-latency', type=float, default=2.0,
+                    help='Maximum seconds of audio buffered for the recognizer before old audio is dropped (default: 2.0)')
+parser.add_argument('--overflow', choices=OVERFLOW_POLICIES, default=DROP_OLDEST,
+                    help='What to do when the recognizer falls behind: drop the oldest audio, or also '
+                         'skip partial results until it catches up (default: drop-oldest)')
+parser.add_argument('--translation-cache', type=int, default=512,
+                    help='Number of translated phrases to keep in memory, 0 disables the cache (default: 512)')
+parser.add_argument('--translation-prefix-reuse', action='store_true',
+                    help='Only translate the new words of a growing partial result (faster, slightly rougher)')
+parser.add_argument('--persist-translation-cache', action='store_true',
+                    help=f'Save cached translations under {TRANSLATOR_MODELS_DIR} so they survive restarts')
 
 args = parser.parse_args()
 
@@ -526,6 +311,23 @@ if selected_language != 'en':
 else:
     print("Using English - no translation needed")
 
+# Translate on a separate thread so recognition never waits for Argos
+if translator:
+    if args.translation_cache > 0:
+        cache_path = None
+        if args.persist_translation_cache:
+            cache_path = TRANSLATOR_MODELS_DIR / f"cache_{translator_lang_code}_en.json"
+        translator = CachedTranslator(
+            translator,
+            maxsize=args.translation_cache,
+            reuse_prefix=args.translation_prefix_reuse,
+            cache_path=cache_path
+        )
+        translation_stage = TranslationStage(translator, show_translation, translator.translate_partial)
+    else:
+        translation_stage = TranslationStage(translator, show_translation)
+    translation_stage.start()
+
 # Load Vosk model
 vosk_model = load_model(selected_language)
 if vosk_model is None:
@@ -556,23 +358,48 @@ else:
 
 # Start audio stream
 print("Starting audio capture...")
+audio_buffer = AudioRingBuffer(
+    max_latency=args.max_latency,
+    sample_rate=SAMPLE_RATE,
+    policy=args.overflow,
+    chunk_samples=BLOCK_SIZE
+)
 audio_stream = sd.RawInputStream(
     callback=audio_callback,
     channels=1,
     samplerate=SAMPLE_RATE,
     dtype="int16",  # Direct int16 input for Vosk, no conversion needed
-    blocksize=4000,  # Smaller chunks (0.25s) for faster partial results
+    blocksize=BLOCK_SIZE,
     device=DEVICE
 )
 audio_stream.start()
 
-# Start transcription thread
-transcription_thread = threading.Thread(target=transcribe_audio, daemon=True)
-transcription_thread.start()
+# Start transcription thread (blocks on the audio buffer while idle)
+transcription_worker = TranscriptionWorker(rec, audio_buffer, show_final, show_partial)
+transcription_worker.start()
+
+# main.py stops us with terminate(), route that through the cleanup below
+signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
 print("Speak into your microphone - captions will appear automatically!")
 
+# Read the webcam on its own thread so a camera stall never holds up the virtual camera
+capture = FrameCapture(cap)
+capture.start()
+stage_times = StageTimes()
+repeated_frames = 0
+
 try:
+    # Inside the try so Ctrl-C / SIGTERM during the measurement still releases everything
+    fps = capture_fps(capture, cap.get(cv2.CAP_PROP_FPS))
+    print(f"Webcam delivering {fps} fps")
+
+    # The webcam may be slower to start than the fps measurement waits for,
+    # don't start sending until there is a frame (or capture gave up)
+    if not capture.wait_for_frames(1, timeout=None):
+        print("Error: Webcam did not deliver any frames")
+        sys.exit(1)
+
     with pyvirtualcam.Camera(
         width=width,
         height=height,
@@ -581,30 +408,38 @@ try:
     ) as cam:
         print(f'Virtual camera started: {cam.device}')
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                print("Failed to read frame from webcam")
-                break
-
-            # Get current caption text and check timeout (thread-safe)
-            with caption_lock:
-                current_time = time.time()
-                time_since_update = current_time - last_update_time
-                
-                # Clear caption if timeout exceeded
-                if time_since_update > CAPTION_TIMEOUT:
-                    current_caption = ""
-                else:
-                    current_caption = caption_text
-            
-            # Flip, add text, then flip back
-            frame = cv2.flip(frame, 1)
-            if current_caption:  # Only add caption if not empty
-                frame = add_caption(frame, current_caption, caption_y, font, font_scale, font_color, font_thickness, outline_color, outline_thickness)
-            frame = cv2.flip(frame, 1)  # Flip back
-
-            cam.send(frame)
+        last_seq = 0
+        output_frame = None
+        while not capture.failed:
+            frame, seq, captured_at = capture.latest()
+            start = time.perf_counter()
+
+            if seq != last_seq:
+                last_seq = seq
+
+                # Get current caption text and check timeout (thread-safe)
+                with caption_lock:
+                    current_time = time.time()
+                    time_since_update = current_time - last_update_time
+
+                    # Clear caption if timeout exceeded
+                    if time_since_update > CAPTION_TIMEOUT:
+                        current_caption = ""
+                    else:
+                        current_caption = caption_text
+
+                # Blend the (mirrored) caption sprite in, it is only re-rendered when the text changes
+                if current_caption:  # Only add caption if not empty
+                    frame = caption_sprite.draw(frame, current_caption, caption_y)
+                output_frame = frame
+                start = stage_times.lap('compose', start)
+            else:
+                # Camera hasn't delivered a new frame yet, repeat the last one
+                repeated_frames += 1
+
+            cam.send(output_frame)
+            start = stage_times.lap('send', start)
+            stage_times.add('frame age', start - captured_at)
             cam.sleep_until_next_frame()
 
 except KeyboardInterrupt:
@@ -612,5 +447,20 @@ except KeyboardInterrupt:
 finally:
     audio_stream.stop()
     audio_stream.close()
+    transcription_worker.stop()
+    transcription_worker.print_stats()
+    if translation_stage:
+        if not translation_stage.stop():
+            print("Warning: A translation is still running, it won't be in the saved cache")
+        translation_stage.print_stats()
+    if isinstance(translator, CachedTranslator):
+        translator.save()
+        translator.print_stats()
+    capture.stop()
     cap.release()
+    print("Frame pipeline latency:")
+    print(f"  {capture.read_times}")
+    print(stage_times)
+    print(f"  {capture.frames_captured} frames captured, {capture.frames_dropped} dropped, "
+          f"{repeated_frames} repeated while the camera stalled")
     print("Virtual camera stopped")
@@ -0,0 +1,252 @@
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+HOLISTIC = "holistic"
+HANDS_POSE = "hands-pose"
+TRACKERS = (HOLISTIC, HANDS_POSE)
+
+# Pose landmark indexes of the wrists (from the signer's point of view)
+POSE_LEFT_WRIST = 15
+POSE_RIGHT_WRIST = 16
+
+# Same attributes as Holistic results, so extract_keypoints_into() and
+# draw_landmarks() work with either tracker
+TrackerResults = namedtuple("TrackerResults", ["pose_landmarks", "left_hand_landmarks", "right_hand_landmarks"])
+NO_LANDMARKS = TrackerResults(None, None, None)
+
+
+def analysis_frame(image_rgb, analysis_width=0):
+    """image_rgb downscaled to analysis_width for the trackers, or as is if it isn't wider
+
+    Landmarks come back normalized to [0, 1] of the image, so they line up with
+    the full resolution frame without any mapping.
+    """
+    h, w = image_rgb.shape[:2]
+    if analysis_width and w > analysis_width:
+        # INTER_LINEAR: INTER_AREA can cost more than the detection saves
+        image_rgb = cv2.resize(image_rgb, (analysis_width, round(h * analysis_width / w)),
+                               interpolation=cv2.INTER_LINEAR)
+    return image_rgb
+
+
+def prepare_frame(frame_bgr, analysis_width=0):
+    """RGB copy of a BGR frame for the trackers, downscaled to analysis_width if it is wider"""
+    # Downscaling first makes the color conversion cheaper too
+    image = cv2.cvtColor(analysis_frame(frame_bgr, analysis_width), cv2.COLOR_BGR2RGB)
+    image.flags.writeable = False
+    return image
+
+
+class HolisticTracker:
+    """MediaPipe Holistic: pose, both hands and the (unused) face mesh"""
+
+    name = HOLISTIC
+
+    def __init__(self, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        self.holistic = mp.solutions.holistic.Holistic(
+            model_complexity=model_complexity,
+            refine_face_landmarks=False,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+
+    def process(self, image_rgb):
+        """Landmarks for one RGB frame"""
+        return self.holistic.process(image_rgb)
+
+    def close(self):
+        self.holistic.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HandsPoseTracker:
+    """Runs only the landmarks the 258-dim feature uses: pose and both hands
+
+    Holistic also runs the 468-point face mesh on every frame, which the sign
+    classifier never sees. This runs the Pose and Hands solutions instead.
+    Hands are matched to the signer's left/right by their distance to the pose
+    wrists, which is how Holistic picks them too (it crops the hands around
+    the pose wrists), and like Holistic no hands are reported without a pose.
+    The landmarks are normalized the same way, so the features have the same
+    layout as Holistic's, but they come from separate models and are not
+    numerically identical. Pose defaults to complexity 1 like the Holistic
+    data the classifier was trained on.
+    """
+
+    name = HANDS_POSE
+
+    def __init__(self, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        self.pose = mp.solutions.pose.Pose(
+            model_complexity=model_complexity,
+            enable_segmentation=False,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+        self.hands = mp.solutions.hands.Hands(
+            max_num_hands=2,
+            model_complexity=min(model_complexity, 1),  # Hands only has lite (0) and full (1)
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+
+    def process(self, image_rgb):
+        """Landmarks for one RGB frame"""
+        pose_landmarks = self.pose.process(image_rgb).pose_landmarks
+        if pose_landmarks is None:
+            # Holistic finds the hands through the pose, skip the hand model too
+            return NO_LANDMARKS
+
+        hands = self.hands.process(image_rgb).multi_hand_landmarks or []
+        left, right = assign_hands(pose_landmarks, hands)
+        return TrackerResults(pose_landmarks, left, right)
+
+    def close(self):
+        self.pose.close()
+        self.hands.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def assign_hands(pose_landmarks, hands):
+    """Split detected hands into (left, right) by the nearest pose wrist"""
+    if not hands:
+        return None, None
+    wrists = np.array([[pose_landmarks.landmark[i].x, pose_landmarks.landmark[i].y]
+                       for i in (POSE_LEFT_WRIST, POSE_RIGHT_WRIST)])
+    hand_wrists = np.array([[hand.landmark[0].x, hand.landmark[0].y] for hand in hands])
+    # distances[i, j]: hand i to pose wrist j (0 = left, 1 = right)
+    distances = np.linalg.norm(hand_wrists[:, None, :] - wrists[None, :, :], axis=2)
+
+    if len(hands) == 1:
+        side = int(np.argmin(distances[0]))
+        return (hands[0], None) if side == 0 else (None, hands[0])
+
+    # Two hands: pick the pairing with the smaller total distance
+    if distances[0, 0] + distances[1, 1] <= distances[0, 1] + distances[1, 0]:
+        return hands[0], hands[1]
+    return hands[1], hands[0]
+
+
+class HandGate:
+    """Only runs the full tracker while someone is signing
+
+    While idle, every check_every-th frame is downscaled to check_width and
+    given to the lite palm detector, and every other frame returns no
+    landmarks without running anything. As soon as a hand is seen the full
+    tracker takes over on every frame (starting with that one), and it hands
+    back to the cheap check after idle_after seconds without hands in its
+    results. Wraps any tracker and has the same process() interface.
+    """
+
+    def __init__(self, tracker, idle_after=3.0, check_every=3, check_width=320, min_detection_confidence=0.5):
+        self.tracker = tracker
+        self.idle_after = idle_after
+        self.check_every = check_every
+        self.check_width = check_width
+        self.detector = mp.solutions.hands.Hands(
+            max_num_hands=1,
+            model_complexity=0,
+            min_detection_confidence=min_detection_confidence
+        )
+        self.name = tracker.name
+        self.active = False
+        self._last_hands = None
+        self._frames_since_check = 0
+
+        self.frames = 0
+        self.frames_tracked = 0
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.activations = 0
+
+    def _hands_seen(self, image_rgb):
+        """Cheap check for a hand on a downscaled copy of the frame"""
+        h, w = image_rgb.shape[:2]
+        if w > self.check_width:
+            image_rgb = cv2.resize(image_rgb, (self.check_width, round(h * self.check_width / w)),
+                                   interpolation=cv2.INTER_AREA)
+        self.frames_checked += 1
+        return self.detector.process(image_rgb).multi_hand_landmarks is not None
+
+    def process(self, image_rgb, now=None):
+        """Landmarks for one RGB frame, NO_LANDMARKS while idle"""
+        if now is None:
+            now = time.monotonic()
+        self.frames += 1
+
+        if not self.active:
+            self._frames_since_check += 1
+            if self._frames_since_check < self.check_every:
+                self.frames_skipped += 1
+                return NO_LANDMARKS
+            self._frames_since_check = 0
+            if not self._hands_seen(image_rgb):
+                return NO_LANDMARKS
+            self.active = True
+            self.activations += 1
+            self._last_hands = now
+
+        results = self.tracker.process(image_rgb)
+        self.frames_tracked += 1
+        if results.left_hand_landmarks is not None or results.right_hand_landmarks is not None:
+            self._last_hands = now
+        elif now - self._last_hands >= self.idle_after:
+            self.active = False
+            self._frames_since_check = 0
+        return results
+
+    def close(self):
+        self.detector.close()
+        self.tracker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        """Return frame counters"""
+        return {
+            'tracked': self.frames_tracked,
+            'checked': self.frames_checked,
+            'skipped': self.frames_skipped,
+            'activations': self.activations,
+            'tracked_ratio': self.frames_tracked / self.frames if self.frames else 0.0,
+        }
+
+    def print_stats(self):
+        """Print how many frames went through the full tracker"""
+        stats = self.stats()
+        print(f"Hand gate: {stats['tracked']} frames tracked ({stats['tracked_ratio'] * 100:.0f}%), "
+              f"{stats['checked']} idle checks, {stats['skipped']} skipped, "
+              f"{stats['activations']} activations")
+
+
+def create_tracker(name=HOLISTIC, model_complexity=None, min_detection_confidence=0.5,
+                   min_tracking_confidence=0.5):
+    """Landmark tracker by name, with its default model complexity unless one is given"""
+    if name not in TRACKERS:
+        raise ValueError(f"Unknown tracker '{name}', expected one of {TRACKERS}")
+    tracker_class = HolisticTracker if name == HOLISTIC else HandsPoseTracker
+    kwargs = {}
+    if model_complexity is not None:
+        kwargs['model_complexity'] = model_complexity
+    return tracker_class(
+        min_detection_confidence=min_detection_confidence,
+        min_tracking_confidence=min_tracking_confidence,
+        **kwargs
+    )
@@ -0,0 +1,339 @@
+# ============================================================
+# Offline transcription of recorded audio (WAV, raw PCM or stdin)
+# - Streams the audio through Vosk as fast as the CPU allows
+# - Word-level timestamps (SetWords) written as JSON or SRT
+# - --jobs N splits long files on silence and transcribes the
+#   parts on N processes
+#
+#   python transcribe_file.py meeting.wav -o meeting.srt --jobs 4
+#   ffmpeg -i talk.mp4 -f s16le -ac 1 -ar 16000 - | python transcribe_file.py - --raw
+# ============================================================
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+from vosk import KaldiRecognizer, Model, SetLogLevel
+
+from vosk_models import LANGUAGE_MODELS, download_model, vosk_model_path
+
+CHUNK_SECONDS = 0.5            # audio handed to AcceptWaveform per call
+SILENCE_FRAME_SECONDS = 0.03   # energy frame used to find silence
+SPLIT_SEARCH_SECONDS = 5.0     # look this far around a split point for the quietest frame
+MIN_PART_SECONDS = 30.0        # don't split into parts shorter than this
+PARTS_PER_JOB = 4              # more parts than processes so they finish together
+
+# SRT cues: a recognizer segment is split into cues of at most
+MAX_CUE_WORDS = 12
+MAX_CUE_SECONDS = 5.0
+
+
+class AudioSource:
+    """16-bit PCM audio from a WAV file, a raw PCM file or stdin
+
+    WAV is detected from the RIFF header unless raw is set, raw audio is
+    little-endian int16 with the given sample rate and channel count. Files
+    are memory-mapped so parts can be read by other processes; stdin can only
+    be streamed once, in order.
+    """
+
+    def __init__(self, path, raw=False, sample_rate=16000, channels=1):
+        self.path = path
+        self.stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        self.seekable = path != '-'
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.data_size = None  # bytes of sample data, None = until EOF
+
+        try:
+            if not raw and self.stream.peek(4)[:4] == b'RIFF':
+                self.sample_rate, self.channels, self.data_size = read_wav_header(self.stream)
+        except Exception:
+            self.close()  # truncated or unsupported WAV, don't leak the file handle
+            raise
+        self.data_offset = self.stream.tell() if self.seekable else 0
+
+    def samples(self):
+        """(frames, channels) int16 memmap of the whole file"""
+        return memmap_samples(self.path, self.data_offset, self.data_size, self.channels)
+
+    def chunks(self, frames):
+        """Read the audio in order as (n, channels) int16 arrays of up to `frames` frames"""
+        frame_bytes = 2 * self.channels
+        remaining = self.data_size
+        while remaining is None or remaining > 0:
+            size = frames * frame_bytes
+            if remaining is not None:
+                size = min(size, remaining)
+            data = self.stream.read(size)
+            data = data[:len(data) - len(data) % frame_bytes]
+            if not data:
+                break
+            if remaining is not None:
+                remaining -= len(data)
+            yield np.frombuffer(data, dtype='<i2').reshape(-1, self.channels)
+
+    def close(self):
+        if self.seekable:
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def memmap_samples(path, data_offset, data_size, channels):
+    """(frames, channels) int16 memmap of the sample data of a file"""
+    available = os.path.getsize(path) - data_offset
+    if data_size is None or data_size > available:
+        data_size = available  # streamed WAVs have no real data size
+    return np.memmap(path, dtype='<i2', mode='r', offset=data_offset,
+                     shape=(data_size // (2 * channels), channels))
+
+
+def read_wav_header(f):
+    """Parse a RIFF/WAVE header, leaving f at the sample data
+
+    Returns (sample_rate, channels, data_size). Only 16-bit PCM is supported.
+    """
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        raise ValueError("Not a WAV file")
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("WAV file has no data chunk")
+        chunk_id, size = header[:4], struct.unpack('<I', header[4:])[0]
+        if chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            # 0 / 0xFFFFFFFF: written by a streaming encoder, read until EOF
+            return fmt[0], fmt[1], None if size in (0, 0xFFFFFFFF) else size
+        body = f.read(size + (size & 1))
+        if chunk_id == b'fmt ':
+            audio_format, channels, sample_rate = struct.unpack('<HHI', body[:8])
+            bits = struct.unpack('<H', body[14:16])[0]
+            if audio_format not in (1, 0xFFFE) or bits != 16:
+                raise ValueError(f"Only 16-bit PCM WAV is supported (format {audio_format}, {bits} bits)")
+            fmt = (sample_rate, channels)
+
+
+def mono_bytes(block):
+    """int16 bytes of a (n, channels) block, channels averaged"""
+    if block.shape[1] > 1:
+        block = block.mean(axis=1).astype('<i2')
+    return block.tobytes()
+
+
+def add_result(segments, result, offset):
+    """Append a Vosk result (with SetWords) as a segment, times shifted by offset seconds"""
+    words = result.get('result')
+    if not words:
+        return
+    words = [{
+        'word': w['word'],
+        'start': round(w['start'] + offset, 3),
+        'end': round(w['end'] + offset, 3),
+        'conf': round(w.get('conf', 1.0), 3),
+    } for w in words]
+    segments.append({
+        'start': words[0]['start'],
+        'end': words[-1]['end'],
+        'text': result.get('text') or " ".join(w['word'] for w in words),
+        'words': words,
+    })
+
+
+def transcribe_chunks(recognizer, chunks, offset=0.0):
+    """Feed int16 mono byte chunks to the recognizer without pausing, return the segments"""
+    segments = []
+    for data in chunks:
+        if recognizer.AcceptWaveform(data):
+            add_result(segments, json.loads(recognizer.Result()), offset)
+    add_result(segments, json.loads(recognizer.FinalResult()), offset)
+    return segments
+
+
+def find_split_points(samples, sample_rate, parts):
+    """Frame indexes splitting samples into about `parts` pieces, each cut in the quietest nearby frame"""
+    total = len(samples)
+    frame = max(1, int(SILENCE_FRAME_SECONDS * sample_rate))
+    search = int(SPLIT_SEARCH_SECONDS * sample_rate)
+    points = [0]
+    for i in range(1, parts):
+        target = total * i // parts
+        lo = max(points[-1] + frame, target - search)
+        hi = min(total - frame, target + search)
+        count = (hi - lo) // frame
+        if count <= 0:
+            continue
+        window = np.asarray(samples[lo:lo + count * frame], dtype=np.float32).mean(axis=1)
+        energy = np.square(window).reshape(count, frame).mean(axis=1)
+        points.append(lo + int(np.argmin(energy)) * frame + frame // 2)
+    points.append(total)
+    return points
+
+
+# --------------- WORKER PROCESSES ---------------
+_worker_model = None
+
+def _init_worker(model_dir):
+    global _worker_model
+    SetLogLevel(-1)
+    _worker_model = Model(model_dir)
+
+def _transcribe_part(job):
+    """Transcribe frames [start, end) of a file, returns (segments, audio seconds, cpu seconds)"""
+    path, data_offset, data_size, channels, sample_rate, start, end = job
+    samples = memmap_samples(path, data_offset, data_size, channels)
+
+    started = time.perf_counter()
+    recognizer = KaldiRecognizer(_worker_model, sample_rate)
+    recognizer.SetWords(True)
+    chunk = int(CHUNK_SECONDS * sample_rate)
+    chunks = (mono_bytes(samples[i:min(i + chunk, end)]) for i in range(start, end, chunk))
+    segments = transcribe_chunks(recognizer, chunks, start / sample_rate)
+    return segments, (end - start) / sample_rate, time.perf_counter() - started
+
+
+def transcribe_parallel(source, model_dir, jobs):
+    """Split the file on silence and transcribe the parts on `jobs` processes"""
+    samples = source.samples()
+    duration = len(samples) / source.sample_rate
+    parts = max(1, min(jobs * PARTS_PER_JOB, int(duration // MIN_PART_SECONDS)))
+    points = find_split_points(samples, source.sample_rate, parts)
+    tasks = [(source.path, source.data_offset, source.data_size, source.channels, source.sample_rate, start, end)
+             for start, end in zip(points, points[1:])]
+    print(f"Split {duration:.0f} s of audio into {len(tasks)} parts for {jobs} processes", file=sys.stderr)
+
+    segments = []
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(str(model_dir),)) as pool:
+        for part_segments, seconds, elapsed in pool.imap(_transcribe_part, tasks):
+            segments.extend(part_segments)
+            print(f"  part of {seconds:.0f} s done in {elapsed:.1f} s ({seconds / max(elapsed, 1e-6):.1f}x real time)",
+                  file=sys.stderr)
+    return segments, duration
+
+
+def transcribe_stream(source, model):
+    """Transcribe the source in one process, reading it in order (works for stdin)"""
+    recognizer = KaldiRecognizer(model, source.sample_rate)
+    recognizer.SetWords(True)
+    frames = 0
+    def chunks():
+        nonlocal frames
+        for block in source.chunks(int(CHUNK_SECONDS * source.sample_rate)):
+            frames += len(block)
+            yield mono_bytes(block)
+    segments = transcribe_chunks(recognizer, chunks())
+    return segments, frames / source.sample_rate
+
+
+# --------------- OUTPUT ---------------
+def srt_time(seconds):
+    ms = int(round(seconds * 1000))
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{ms:03d}"
+
+def to_srt(segments):
+    """SRT subtitles, segments split into cues of at most MAX_CUE_WORDS / MAX_CUE_SECONDS"""
+    cues = []
+    for segment in segments:
+        cue = []
+        for word in segment['words']:
+            if cue and (len(cue) >= MAX_CUE_WORDS or word['end'] - cue[0]['start'] > MAX_CUE_SECONDS):
+                cues.append(cue)
+                cue = []
+            cue.append(word)
+        if cue:
+            cues.append(cue)
+    return "\n".join(
+        f"{i}\n{srt_time(cue[0]['start'])} --> {srt_time(cue[-1]['end'])}\n{' '.join(w['word'] for w in cue)}\n"
+        for i, cue in enumerate(cues, 1)
+    )
+
+def to_json(segments, source, duration, language):
+    return json.dumps({
+        'audio': source.path,
+        'language': language,
+        'duration': round(duration, 3),
+        'segments': segments,
+    }, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transcribe recorded audio with word-level timestamps')
+    parser.add_argument('input', help="WAV or raw 16-bit PCM file, '-' for stdin")
+    parser.add_argument('--language', '-l', default='en', choices=sorted(LANGUAGE_MODELS),
+                        help='Language code of the Vosk model (default: en)')
+    parser.add_argument('--model', help='Path to a Vosk model directory (overrides --language)')
+    parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+    parser.add_argument('--format', '-f', choices=['json', 'srt'],
+                        help='Output format (default: from the --output extension, else json)')
+    parser.add_argument('--raw', action='store_true', help='Input is raw little-endian 16-bit PCM, not WAV')
+    parser.add_argument('--sample-rate', type=int, default=16000, help='Sample rate of raw input (default: 16000)')
+    parser.add_argument('--channels', type=int, default=1, help='Channels of raw input (default: 1)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Processes to split a file across, 0 = one per CPU (default: 1)')
+    args = parser.parse_args()
+
+    output_format = args.format
+    if output_format is None:
+        output_format = 'srt' if args.output and args.output.lower().endswith('.srt') else 'json'
+    jobs = args.jobs or os.cpu_count() or 1
+
+    # Progress goes to stderr, stdout may be the transcript
+    if args.model:
+        model_dir = args.model
+    else:
+        model_dir = vosk_model_path(args.language)
+        if not model_dir.exists():
+            with contextlib.redirect_stdout(sys.stderr):
+                if not download_model(args.language):
+                    sys.exit(1)
+
+    try:
+        source = AudioSource(args.input, args.raw, args.sample_rate, args.channels)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not read {args.input}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Transcribing {args.input} ({source.sample_rate} Hz, {source.channels} channel(s))", file=sys.stderr)
+
+    SetLogLevel(-1)
+    started = time.perf_counter()
+    if jobs > 1 and not source.seekable:
+        print("Warning: --jobs needs a file, transcribing stdin in one process", file=sys.stderr)
+        jobs = 1
+    with source:
+        if jobs > 1:
+            segments, duration = transcribe_parallel(source, model_dir, jobs)
+        else:
+            segments, duration = transcribe_stream(source, Model(str(model_dir)))
+    elapsed = time.perf_counter() - started
+
+    text = to_srt(segments) if output_format == 'srt' else to_json(segments, source, duration, args.language)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+    words = sum(len(s['words']) for s in segments)
+    print(f"Transcribed {duration:.1f} s of audio in {elapsed:.1f} s "
+          f"({duration / max(elapsed, 1e-6):.1f}x real time, {jobs} process(es)), "
+          f"{len(segments)} segments, {words} words", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import collections
+import json
+import threading
+import time
+from pathlib import Path
+
+
+def normalize_phrase(text):
+    """Cache key for a phrase - lowercase with whitespace collapsed"""
+    return ' '.join(text.split()).lower()
+
+
+class CachedTranslator:
+    """Bounded LRU memoizing layer around a translate(text) function
+
+    Keys are normalized source phrases, so repeated greetings and re-emitted
+    partials come straight from memory. With reuse_prefix enabled, a partial
+    that only adds words to the previous partial reuses the previous
+    translation and only translates the new words. That is a little rougher
+    than translating the whole phrase, so it is only used for partials, finals
+    always get a full translation. The cache can be saved to a JSON file so
+    warm phrases survive restarts. Lookups and inserts take a lock, so save()
+    can run while a translation thread is still busy.
+    """
+
+    def __init__(self, translate, maxsize=512, reuse_prefix=False, cache_path=None):
+        self.translate = translate
+        self.maxsize = maxsize
+        self.reuse_prefix = reuse_prefix
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._last_partial = None  # (key, translation) of the previous partial
+
+        self.hits = 0
+        self.misses = 0
+        self.prefix_hits = 0
+
+        if self.cache_path:
+            self.load()
+
+    def __call__(self, text):
+        """Translate a full phrase, using the cache when possible"""
+        key = normalize_phrase(text)
+        if not key:
+            return text
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        # Not under the lock, a translation can take seconds
+        translated = self.translate(text)
+        with self._lock:
+            self._cache[key] = translated
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return translated
+
+    def translate_partial(self, text):
+        """Translate a partial result, reusing the previous partial when it is a prefix"""
+        key = normalize_phrase(text)
+        with self._lock:
+            cached = key in self._cache
+        if self.reuse_prefix and self._last_partial and not cached:
+            last_key, last_translation = self._last_partial
+            if key.startswith(last_key + ' '):
+                self.prefix_hits += 1
+                translated = f"{last_translation} {self(key[len(last_key) + 1:])}"
+                self._last_partial = (key, translated)
+                return translated
+
+        translated = self(text)
+        self._last_partial = (key, translated)
+        return translated
+
+    def load(self):
+        """Load cached phrases saved by an earlier run"""
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if not isinstance(entries, list):
+                raise ValueError("expected a list of [phrase, translation] pairs")
+            loaded = {}
+            for entry in entries[-self.maxsize:]:
+                if not (isinstance(entry, list) and len(entry) == 2
+                        and isinstance(entry[0], str) and isinstance(entry[1], str)):
+                    raise ValueError(f"malformed entry {entry!r}")
+                loaded[entry[0]] = entry[1]
+        except Exception as e:
+            print(f"Warning: Could not load translation cache, starting empty: {e}")
+            return
+        with self._lock:
+            self._cache.update(loaded)
+        print(f"Loaded {len(self._cache)} cached translations from {self.cache_path}")
+
+    def save(self):
+        """Write the cache to disk, least recently used first"""
+        if not self.cache_path:
+            return
+        with self._lock:
+            entries = list(self._cache.items())
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"Warning: Could not save translation cache: {e}")
+
+    def stats(self):
+        """Return cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'prefix_hits': self.prefix_hits,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def print_stats(self):
+        """Print a one-line summary of the cache counters"""
+        s = self.stats()
+        print(f"Translation cache: {s['size']} phrases, {s['hits']} hits, {s['misses']} misses "
+              f"({s['hit_rate'] * 100:.0f}% hit rate), {s['prefix_hits']} prefix reuses")
+
+
+class TranslationStage:
+    """Runs translations on their own thread so recognition never waits on them
+
+    Finals are queued and always translated, in order. Partials are coalesced:
+    only the newest pending partial is kept, and a final drops any partial that
+    is still waiting since the final supersedes it. An Argos call that is
+    already running can't be interrupted, so its result is handed to on_result
+    together with the tag it was submitted with and the caller decides whether
+    it is still worth showing. Partials go through translate_partial when one
+    is given, e.g. CachedTranslator.translate_partial.
+    """
+
+    def __init__(self, translate, on_result, translate_partial=None):
+        self.translate = translate
+        self.translate_partial = translate_partial or translate
+        self.on_result = on_result
+
+        self._finals = collections.deque()
+        self._partial = None
+        self._running = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self.finals_translated = 0
+        self.partials_translated = 0
+        self.partials_skipped = 0
+        self.translate_seconds = 0.0
+
+    def start(self):
+        """Start the translation thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the translation thread, dropping anything still pending
+
+        Returns False if a translation is still running after the timeout.
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def submit(self, text, final, tag=None):
+        """Queue text for translation, replacing any older pending partial"""
+        with self._cond:
+            if self._partial is not None:
+                self.partials_skipped += 1
+                self._partial = None
+            if final:
+                self._finals.append((text, tag))
+            else:
+                self._partial = (text, tag)
+            self._cond.notify()
+
+    def _next_job(self):
+        """Block until there is something to translate, finals first"""
+        with self._cond:
+            while self._running and not self._finals and self._partial is None:
+                self._cond.wait()
+            if not self._running:
+                return None
+            if self._finals:
+                text, tag = self._finals.popleft()
+                return text, tag, True
+            text, tag = self._partial
+            self._partial = None
+            return text, tag, False
+
+    def run(self):
+        """Thread function translating submitted text as it comes in"""
+        while True:
+            job = self._next_job()
+            if job is None:
+                break
+            text, tag, final = job
+
+            start = time.perf_counter()
+            try:
+                if final:
+                    translated = self.translate(text)
+                else:
+                    translated = self.translate_partial(text)
+            except Exception as e:
+                print(f"Translation error: {e}, using original text")
+                translated = text
+            self.translate_seconds += time.perf_counter() - start
+
+            if final:
+                self.finals_translated += 1
+            else:
+                self.partials_translated += 1
+            self.on_result(tag, text, translated, final)
+
+    def stats(self):
+        """Return translation counters"""
+        translated = self.finals_translated + self.partials_translated
+        return {
+            'finals_translated': self.finals_translated,
+            'partials_translated': self.partials_translated,
+            'partials_skipped': self.partials_skipped,
+            'avg_translate_ms': self.translate_seconds * 1000 / translated if translated else 0.0,
+        }
+
+    def print_stats(self):
+        """Print a one-line summary of the translation counters"""
+        s = self.stats()
+        print(f"Translation stats: {s['finals_translated']} finals, "
+              f"{s['partials_translated']} partials translated, "
+              f"{s['partials_skipped']} stale partials skipped, "
+              f"{s['avg_translate_ms']:.1f} ms per translation")
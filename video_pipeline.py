@@ -0,0 +1,110 @@
+import threading
+import time
+
+from perf import LatencyStats
+
+DEFAULT_FPS = 30
+
+
+class FrameCapture:
+    """Reads webcam frames on a background thread, the newest frame wins
+
+    The consumer never waits on cap.read(): latest() returns the most recent
+    frame straight away, so a camera stall only means the same frame is sent
+    again instead of the virtual camera missing frames. Frames that are
+    replaced before anyone took them are counted as dropped. The capture rate
+    is measured from the frame timestamps so output can be paced to it.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.read_times = LatencyStats('capture')
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.failed = False
+
+        self._frame = None
+        self._seq = 0
+        self._timestamp = None
+        self._taken_seq = 0
+        self._intervals = []  # Recent frame intervals, for measuring fps
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Start the capture thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the capture thread"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        """Thread function reading frames as fast as the camera delivers them"""
+        while self._running:
+            start = time.perf_counter()
+            ret, frame = self.cap.read()
+            now = time.perf_counter()
+            if not ret or frame is None:
+                print("Failed to read frame from webcam")
+                with self._cond:
+                    self.failed = True
+                    self._cond.notify_all()
+                break
+            self.read_times.add(now - start)
+
+            with self._cond:
+                if self._seq > self._taken_seq:
+                    self.frames_dropped += 1
+                if self._timestamp is not None:
+                    self._intervals.append(now - self._timestamp)
+                    del self._intervals[:-60]
+                self._frame = frame
+                self._seq += 1
+                self._timestamp = now
+                self.frames_captured += 1
+                self._cond.notify_all()
+
+    def wait_for_frames(self, count, timeout=5.0):
+        """Block until count frames have been captured (or capture failed), timeout None waits forever"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while self.frames_captured < count and not self.failed:
+                if deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self.frames_captured >= count
+
+    def latest(self):
+        """Return (frame, seq, timestamp) of the newest frame without blocking"""
+        with self._cond:
+            self._taken_seq = self._seq
+            return self._frame, self._seq, self._timestamp
+
+    def measured_fps(self, fallback=DEFAULT_FPS):
+        """Capture rate measured from recent frame intervals"""
+        with self._cond:
+            intervals = sorted(self._intervals)
+        if not intervals:
+            return fallback
+        # Median interval, so one slow frame at start-up doesn't skew it
+        return 1.0 / max(intervals[len(intervals) // 2], 1e-3)
+
+
+def capture_fps(capture, cap_prop_fps, fallback=DEFAULT_FPS):
+    """Pick the output frame rate: measured capture rate, then what the driver reports"""
+    if capture.wait_for_frames(15):
+        return max(1, int(round(capture.measured_fps(fallback))))
+    if 1 <= cap_prop_fps <= 120:
+        return int(round(cap_prop_fps))
+    return fallback
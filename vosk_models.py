@@ -0,0 +1,147 @@
+import os
+import sys
+import urllib.request
+import zipfile
+from pathlib import Path
+
+from vosk import Model
+
+# Language model configurations
+LANGUAGE_MODELS = {
+    'en': {
+        'name': 'vosk-model-small-en-us-0.15',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip',
+        'display_name': 'English'
+    },
+    'es': {
+        'name': 'vosk-model-small-es-0.42',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-es-0.42.zip',
+        'display_name': 'Spanish'
+    },
+    'fr': {
+        'name': 'vosk-model-small-fr-0.22',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-fr-0.22.zip',
+        'display_name': 'French'
+    },
+    'de': {
+        'name': 'vosk-model-small-de-0.15',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-de-0.15.zip',
+        'display_name': 'German'
+    },
+    'ru': {
+        'name': 'vosk-model-small-ru-0.22',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-ru-0.22.zip',
+        'display_name': 'Russian'
+    },
+    'zh': {
+        'name': 'vosk-model-small-cn-0.22',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-cn-0.22.zip',
+        'display_name': 'Chinese'
+    },
+    'ja': {
+        'name': 'vosk-model-small-ja-0.22',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-ja-0.22.zip',
+        'display_name': 'Japanese'
+    },
+    'pt': {
+        'name': 'vosk-model-small-pt-0.3',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-pt-0.3.zip',
+        'display_name': 'Portuguese'
+    },
+    'it': {
+        'name': 'vosk-model-small-it-0.22',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-it-0.22.zip',
+        'display_name': 'Italian'
+    },
+    'hi': {
+        'name': 'vosk-model-small-hi-0.22',
+        'url': 'https://alphacephei.com/vosk/models/vosk-model-small-hi-0.22.zip',
+        'display_name': 'Hindi'
+    }
+}
+
+# Directory paths for models
+MODELS_DIR = Path('models')
+VOSK_MODELS_DIR = MODELS_DIR / 'vosk'
+
+def download_model(language_code):
+    """Download and extract Vosk model for specified language"""
+    if language_code not in LANGUAGE_MODELS:
+        print(f"Error: Language '{language_code}' not supported.")
+        print(f"Available languages: {', '.join(LANGUAGE_MODELS.keys())}")
+        return False
+    
+    model_info = LANGUAGE_MODELS[language_code]
+    model_path = model_info['name']
+    model_url = model_info['url']
+    zip_filename = f"{model_path}.zip"
+    
+    # Ensure vosk models directory exists
+    VOSK_MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    
+    print(f"\nDownloading {model_info['display_name']} model...")
+    print(f"URL: {model_url}")
+    print("This may take a few minutes depending on your connection...")
+    
+    try:
+        # Download with progress
+        def reporthook(blocknum, blocksize, totalsize):
+            downloaded = blocknum * blocksize
+            if totalsize > 0:
+                percent = min(downloaded * 100 / totalsize, 100)
+                sys.stdout.write(f"\rProgress: {percent:.1f}% ({downloaded / 1024 / 1024:.1f} MB / {totalsize / 1024 / 1024:.1f} MB)")
+                sys.stdout.flush()
+        
+        urllib.request.urlretrieve(model_url, zip_filename, reporthook)
+        print("\n\nExtracting model...")
+        
+        # Extract zip file to vosk models directory
+        with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
+            zip_ref.extractall(str(VOSK_MODELS_DIR))
+        
+        # Remove zip file
+        os.remove(zip_filename)
+        print(f"Model downloaded and extracted successfully to: {VOSK_MODELS_DIR / model_path}")
+        return True
+        
+    except Exception as e:
+        print(f"\n\nError downloading model: {e}")
+        if os.path.exists(zip_filename):
+            os.remove(zip_filename)
+        return False
+
+def load_model(language_code):
+    """Load Vosk model, downloading if necessary"""
+    if language_code not in LANGUAGE_MODELS:
+        print(f"Error: Language '{language_code}' not supported.")
+        print(f"Available languages: {', '.join(LANGUAGE_MODELS.keys())}")
+        return None
+    
+    model_name = LANGUAGE_MODELS[language_code]['name']
+    display_name = LANGUAGE_MODELS[language_code]['display_name']
+    model_path = VOSK_MODELS_DIR / model_name
+    
+    # Check if model exists
+    if not model_path.exists():
+        print(f"\n{display_name} model not found at: {model_path}")
+        response = input("Would you like to download it now? (y/n): ").strip().lower()
+        if response == 'y' or response == 'yes':
+            if not download_model(language_code):
+                return None
+        else:
+            print("Cannot proceed without model. Exiting.")
+            return None
+    
+    # Load the model
+    print(f"\nLoading {display_name} model from {model_path}...")
+    try:
+        model = Model(str(model_path))
+        print(f"{display_name} model loaded successfully!")
+        return model
+    except Exception as e:
+        print(f"Error loading Vosk model: {e}")
+        return None
+
+def vosk_model_path(language_code):
+    """Directory the Vosk model for language_code is (or would be) extracted to"""
+    return VOSK_MODELS_DIR / LANGUAGE_MODELS[language_code]['name']